@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
@@ -7,33 +6,16 @@ import shelve
 from dotenv import load_dotenv
 import time
 import uuid
-import hashlib
 
 load_dotenv()
 
-from logic.data_processing import clean_and_process_data
-from logic.chunking import create_text_chunks, chunk_texts_intelligently
-from logic.embedding import get_embedding_model
-from logic.qa_chain import get_qa_chain
-from utils.session import init_session_state, update_data_sources, load_data_sources, save_data_sources
+from utils.session import init_session_state, update_data_sources, load_data_sources, remove_data_source, get_retrieval_context
 from utils.auth import require_auth, show_logout_button, is_authenticated, show_login_form, is_admin, show_admin_panel
-from core.vector_store import PineconeVectorStore
+from utils.startup import warm_up_in_background, restore_snapshot_on_boot, get_readiness
 
 USER_AVATAR = "👤"
 BOT_AVATAR = "🤖"
 
-SELECTED_COLUMNS = [
-    "ที่มาของ Feedback",
-    "BU",
-    "บคญ./บทญ.",
-    "ประเภท Feedback",
-    "รายละเอียด Feedback",
-    "แนวทางการดำเนินการ",
-    "สถานะการแจ้ง Process Owner ",
-    "Status",
-    "รายละเอียด Status"
-]
-
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
@@ -55,12 +37,24 @@ def save_all_chats(chats: Dict[str, List[Dict]]):
     except Exception as e:
         st.error(f"Error saving chat sessions: {e}")
 
-def get_file_hash(file_content: bytes) -> str:
-    return hashlib.md5(file_content).hexdigest()
+def get_qa_chain(vectordb):
+    from utils.query_client import QueryServiceClient, QUERY_API_URL
+    if QUERY_API_URL:
+        return QueryServiceClient(QUERY_API_URL)
+
+    from logic.qa_chain import get_qa_chain as build_qa_chain
+    from logic.routing import get_routed_qa_chain, ROUTER_ENABLED
+    from logic.coalescing import CoalescingQAChain
+    from core.manifest_store import get_manifest_store
+    qa_chain = get_routed_qa_chain(vectordb) if ROUTER_ENABLED else build_qa_chain(vectordb)
+    return CoalescingQAChain(qa_chain, get_manifest_store().data_version)
 
 def initialize_vector_store():
+    from core.vector_store import get_vector_store
+    from logic.snapshot import vector_store_kwargs
+
     try:
-        vector_store = PineconeVectorStore()
+        vector_store = get_vector_store(**vector_store_kwargs(restore_snapshot_on_boot()))
         st.session_state.vectordb = vector_store
         
         data_sources = load_data_sources()
@@ -76,6 +70,9 @@ def initialize_vector_store():
         st.session_state.qa_chain = None
 
 def process_uploaded_files(uploaded_files: List) -> Tuple[List[str], Dict[str, Any]]:
+    from logic.ingestion import prepare_workbook, index_prepared_file, get_file_hash, MissingColumnsError
+    from logic.embedding import get_embedding_model
+
     new_chunks = []
     file_info = {}
     vector_store = st.session_state.vectordb
@@ -83,6 +80,7 @@ def process_uploaded_files(uploaded_files: List) -> Tuple[List[str], Dict[str, A
     upload_dir = DATA_DIR / "uploads"
     upload_dir.mkdir(parents=True, exist_ok=True)
 
+    prepared_files = []
     for file in uploaded_files:
         file.seek(0, 2)
         size_mb = file.tell() / (1024 * 1024)
@@ -93,7 +91,7 @@ def process_uploaded_files(uploaded_files: List) -> Tuple[List[str], Dict[str, A
 
         file_content = file.getbuffer()
         file_hash = get_file_hash(file_content)
-        
+    
         if file.name in st.session_state.data_sources:
             existing_hash = st.session_state.data_sources[file.name].get('file_hash', '')
             if existing_hash == file_hash:
@@ -109,53 +107,39 @@ def process_uploaded_files(uploaded_files: List) -> Tuple[List[str], Dict[str, A
             continue
 
         try:
-            df = pd.read_excel(save_path)
-            missing_columns = [col for col in SELECTED_COLUMNS if col not in df.columns]
-            if missing_columns:
-                st.error(f"❌ File '{file.name}' is missing required columns: {', '.join(missing_columns)}. File will be skipped.")
-                if save_path.exists():
-                    save_path.unlink()
-                continue
-
-            processed_data = clean_and_process_data(df, SELECTED_COLUMNS)
-            chunks = create_text_chunks(processed_data, SELECTED_COLUMNS)
-            chunks = chunk_texts_intelligently(chunks)
-            
-            embeddings = get_embedding_model()
-            vectors = embeddings.embed_documents(chunks)
-            
-            chunk_ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
-            payloads = [{"text": chunk, "filename": file.name, "original_id": f"{file.name}_{i}"} for i, chunk in enumerate(chunks)]
-            
-            vector_store.insert_vectors(vectors, ids=chunk_ids, payloads=payloads)
-            
-            new_chunks.extend(chunks)
-
-            file_info[file.name] = {
-                "upload_date": datetime.now().isoformat(),
-                "rows": len(processed_data),
-                "chunks": len(chunks),
-                "filename": file.name,
-                "file_hash": file_hash,
-                "chunk_ids": chunk_ids
-            }
-
-            st.success(f"✅ Processed {file.name} ({len(chunks)} chunks)")
+            prepared_files.append((prepare_workbook(save_path, filename=file.name, file_hash=file_hash), save_path))
+        except MissingColumnsError as e:
+            st.error(f"❌ {str(e)}. File will be skipped.")
+            if save_path.exists():
+                save_path.unlink()
         except Exception as e:
             st.error(f"❌ Failed to process {file.name}: {str(e)}")
             if save_path.exists():
                 save_path.unlink()
-            continue
+
+    if not prepared_files:
+        return new_chunks, file_info
+
+    with vector_store.batch():
+        for prepared, save_path in prepared_files:
+            try:
+                file_info[prepared.filename] = index_prepared_file(prepared, vector_store, get_embedding_model())
+                new_chunks.extend(prepared.chunks)
+
+                st.success(f"✅ Processed {prepared.filename} ({len(prepared.chunks)} chunks)")
+            except Exception as e:
+                st.error(f"❌ Failed to process {prepared.filename}: {str(e)}")
+                if save_path.exists():
+                    save_path.unlink()
 
     return new_chunks, file_info
 
 def delete_file_from_vector_store(filename: str):
     try:
-        vector_store = st.session_state.vectordb
-        if filename in st.session_state.data_sources:
-            chunk_ids = st.session_state.data_sources[filename].get('chunk_ids', [])
-            if chunk_ids:
-                vector_store.delete_vectors(chunk_ids)
+        from logic.ingestion import delete_indexed_file
+
+        chunk_ids = remove_data_source(filename)
+        delete_indexed_file(filename, st.session_state.vectordb, known_ids=chunk_ids)
         
         file_path = DATA_DIR / "uploads" / filename
         if file_path.exists():
@@ -208,13 +192,25 @@ def initialize_active_chat():
     
     return all_chats
 
+def show_readiness():
+    readiness = get_readiness()
+    snapshot = f" (snapshot {readiness['snapshot']})" if readiness["snapshot"] else ""
+    if readiness["ready"]:
+        st.caption(f"🟢 Ready in {readiness['warm_up_seconds']}s{snapshot}")
+    elif readiness["stage"] == "degraded":
+        st.caption(f"🟠 Warm-up failed, answers may be slow: {readiness['error']}")
+    else:
+        st.caption(f"⏳ Warming up{snapshot}... first answers may be slow")
+
 @require_auth()
 def main_app():
     if is_admin():
         show_admin_panel()
         return
     
+    restore_snapshot_on_boot()
     init_session_state()
+    warm_up_in_background()
     
     if not st.session_state.vectordb:
         initialize_vector_store()
@@ -231,6 +227,7 @@ def main_app():
 
     with st.sidebar:
         show_logout_button()
+        show_readiness()
         
         st.header("💬 Chats")
 
@@ -304,9 +301,9 @@ def main_app():
             with st.spinner("Processing files..."):
                 new_chunks, file_info = process_uploaded_files(uploaded_files)
                 if file_info:
-                    update_data_sources(file_info)
-                    st.session_state.data_sources.update(file_info)
-                    save_data_sources(st.session_state.data_sources)
+                    replaced_chunk_ids = update_data_sources(file_info)
+                    if replaced_chunk_ids:
+                        st.session_state.vectordb.delete_vectors(replaced_chunk_ids)
                     
                     if not st.session_state.qa_chain:
                         st.session_state.qa_chain = get_qa_chain(st.session_state.vectordb)
@@ -335,8 +332,6 @@ def main_app():
                     st.warning(f"⚠️ Are you sure you want to delete '{filename}'?")
                     if confirm_cols[0].button("✅ Yes, Delete", key=f"confirm_del_file_{filename}"):
                         delete_file_from_vector_store(filename)
-                        del st.session_state.data_sources[filename]
-                        save_data_sources(st.session_state.data_sources)
                         
                         if not st.session_state.data_sources:
                             st.session_state.qa_chain = None
@@ -357,6 +352,8 @@ def main_app():
             st.markdown(message["content"])
 
     if prompt := st.chat_input("Ask about the feedback data..."):
+        from logic.exhaustive import is_exhaustive_request
+
         if not st.session_state.qa_chain:
             st.warning("Please upload and process some data files first to enable the chatbot.")
             st.stop()
@@ -368,13 +365,21 @@ def main_app():
             full_response = ""
             try:
                 message_placeholder.markdown("Searching for answers... 🔍")
-                response = st.session_state.qa_chain.invoke({"query": prompt})
-                full_response = response["result"].replace("\n", "  \n")
-                typed_response = ""
-                for char in full_response:
-                    typed_response += char
-                    message_placeholder.markdown(typed_response)
-                    time.sleep(0.005)
+                if is_exhaustive_request(prompt):
+                    for page in st.session_state.qa_chain.stream(prompt):
+                        full_response += page
+                        message_placeholder.markdown(full_response)
+                else:
+                    response = st.session_state.qa_chain.invoke({
+                        "query": prompt,
+                        "retrieval_context": get_retrieval_context(st.session_state.active_chat_id)
+                    })
+                    full_response = response["result"].replace("\n", "  \n")
+                    typed_response = ""
+                    for char in full_response:
+                        typed_response += char
+                        message_placeholder.markdown(typed_response)
+                        time.sleep(0.005)
             except Exception as e:
                 full_response = f"Sorry, I encountered an error: {str(e)}"
                 message_placeholder.markdown(full_response)
@@ -0,0 +1,173 @@
+from pathlib import Path
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import json
+
+DEDUP_INDEX_PATH = Path("data") / "dedup_index.db"
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    chunk_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    canonical_id TEXT NOT NULL,
+    payload TEXT,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signatures_filename ON signatures (filename);
+CREATE INDEX IF NOT EXISTS signatures_canonical ON signatures (canonical_id);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    chunk_id TEXT NOT NULL REFERENCES signatures (chunk_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS buckets_chunk_id ON buckets (chunk_id);
+"""
+
+class NearDuplicateIndex:
+    def __init__(self, path: Path = DEDUP_INDEX_PATH, num_permutations: int = NUM_PERMUTATIONS, bands: int = LSH_BANDS):
+        if num_permutations % bands:
+            raise ValueError(f"{num_permutations} permutations cannot be split into {bands} bands")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows_per_band = num_permutations // bands
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def _band_buckets(self, signature: np.ndarray) -> Iterator[Tuple[int, int]]:
+        for band in range(self.bands):
+            rows = signature[band * self.rows_per_band:(band + 1) * self.rows_per_band]
+            digest = hashlib.blake2b(rows.astype("<u4").tobytes(), digest_size=8).digest()
+            yield band, int.from_bytes(digest, "little", signed=True)
+
+    def _signature(self, blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype="<u4")
+
+    def find_canonical(self, signature: np.ndarray, threshold: float) -> Optional[Tuple[str, float]]:
+        clauses = " OR ".join(["(band = ? AND bucket = ?)"] * self.bands)
+        params = [value for pair in self._band_buckets(signature) for value in pair]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT s.chunk_id, s.signature FROM buckets b "
+                f"JOIN signatures s ON s.chunk_id = b.chunk_id WHERE {clauses}",
+                params
+            ).fetchall()
+
+        best = None
+        for row in rows:
+            similarity = float(np.mean(self._signature(row["signature"]) == signature))
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (row["chunk_id"], similarity)
+        return best
+
+    def add_canonical(self, chunk_id: str, filename: str, signature: np.ndarray):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM signatures WHERE chunk_id = ?", (chunk_id,))
+                self._conn.execute(
+                    "INSERT INTO signatures (chunk_id, filename, canonical_id, payload, signature) VALUES (?, ?, ?, NULL, ?)",
+                    (chunk_id, filename, chunk_id, signature.astype("<u4").tobytes())
+                )
+                self._conn.executemany(
+                    "INSERT INTO buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                    [(band, bucket, chunk_id) for band, bucket in self._band_buckets(signature)]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_duplicate(self, chunk_id: str, filename: str, canonical_id: str, payload: Dict[str, Any], signature: np.ndarray):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (chunk_id, filename, canonical_id, payload, signature) VALUES (?, ?, ?, ?, ?)",
+                (chunk_id, filename, canonical_id, json.dumps(payload, ensure_ascii=False), signature.astype("<u4").tobytes())
+            )
+
+    def file_entries(self, filename: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, canonical_id FROM signatures WHERE filename = ?", (filename,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def duplicates_of(self, canonical_id: str, exclude_filename: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, filename, payload FROM signatures "
+                "WHERE canonical_id = ? AND chunk_id != ? AND filename IS NOT ? ORDER BY rowid",
+                (canonical_id, canonical_id, exclude_filename)
+            ).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def sources(self, canonical_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename FROM signatures WHERE canonical_id = ? ORDER BY chunk_id != canonical_id, rowid",
+                (canonical_id,)
+            ).fetchall()
+        return list(dict.fromkeys(row["filename"] for row in rows))
+
+    def promote(self, old_canonical_id: str, new_canonical_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT signature FROM signatures WHERE chunk_id = ?", (new_canonical_id,)
+                ).fetchone()
+                self._conn.execute(
+                    "UPDATE signatures SET canonical_id = ? WHERE canonical_id = ?", (new_canonical_id, old_canonical_id)
+                )
+                self._conn.execute("UPDATE signatures SET payload = NULL WHERE chunk_id = ?", (new_canonical_id,))
+                self._conn.executemany(
+                    "INSERT INTO buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                    [(band, bucket, new_canonical_id) for band, bucket in self._band_buckets(self._signature(row["signature"]))]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove_file(self, filename: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM signatures WHERE filename = ?", (filename,))
+        return cursor.rowcount
+
+    def backup_to(self, target: Path) -> Path:
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        destination = sqlite3.connect(str(target))
+        try:
+            with self._lock:
+                self._conn.backup(destination)
+        finally:
+            destination.close()
+        return target
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS total, SUM(chunk_id = canonical_id) AS canonical FROM signatures"
+            ).fetchone()
+        total, canonical = row["total"], row["canonical"] or 0
+        return {"chunks": total, "canonical": canonical, "duplicates": total - canonical}
+
+@lru_cache(maxsize=None)
+def get_dedup_index(path: Path = DEDUP_INDEX_PATH) -> NearDuplicateIndex:
+    return NearDuplicateIndex(path)
+
+def open_dedup_index(path: Path = DEDUP_INDEX_PATH) -> Optional[NearDuplicateIndex]:
+    return get_dedup_index(path) if Path(path).exists() else None
@@ -0,0 +1,179 @@
+from pathlib import Path
+from functools import lru_cache
+from typing import List, Optional, Dict, Any
+import threading
+import sqlite3
+import logging
+import json
+
+MANIFEST_DB_PATH = Path("data") / "manifest.db"
+LEGACY_DATA_SOURCES_PATH = Path("data") / "data_sources.json"
+SUMMARY_FIELDS = ("filename", "file_hash", "upload_date", "rows", "chunks")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    filename TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    upload_date TEXT,
+    rows INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_file_hash ON files (file_hash);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL REFERENCES files (filename) ON DELETE CASCADE,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_filename ON chunks (filename, position);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+"""
+
+class ManifestStore:
+    def __init__(self, path: Path = MANIFEST_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def _summary(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {field: row[field] for field in SUMMARY_FIELDS}
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files ORDER BY upload_date, filename").fetchall()
+        return {row["filename"]: self._summary(row) for row in rows}
+
+    def get_file(self, filename: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE filename = ?", (filename,)).fetchone()
+        return self._summary(row) if row else None
+
+    def find_by_hash(self, file_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM files WHERE file_hash = ? LIMIT 1", (file_hash,)).fetchone()
+        return row["filename"] if row else None
+
+    def get_chunk_ids(self, filename: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE filename = ? ORDER BY position", (filename,)
+            ).fetchall()
+        return [row["chunk_id"] for row in rows]
+
+    def has_chunk(self, chunk_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+        return row is not None
+
+    def data_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()["value"]
+
+    def _bump_data_version(self):
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+    def unknown_chunk_ids(self, chunk_ids: List[str]) -> List[str]:
+        if not chunk_ids:
+            return []
+        placeholders = ",".join("?" * len(chunk_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({placeholders})", list(chunk_ids)
+            ).fetchall()
+        known = {row["chunk_id"] for row in rows}
+        return [chunk_id for chunk_id in chunk_ids if chunk_id not in known]
+
+    def upsert_file(self, info: Dict[str, Any]) -> List[str]:
+        filename = info["filename"]
+        chunk_ids = info.get("chunk_ids", [])
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                replaced = [
+                    row["chunk_id"] for row in self._conn.execute(
+                        "SELECT chunk_id FROM chunks WHERE filename = ?", (filename,)
+                    )
+                ]
+                self._conn.execute("DELETE FROM chunks WHERE filename = ?", (filename,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files (filename, file_hash, upload_date, rows, chunks) VALUES (?, ?, ?, ?, ?)",
+                    (filename, info.get("file_hash", ""), info.get("upload_date"), info.get("rows", 0), info.get("chunks", len(chunk_ids)))
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, filename, position) VALUES (?, ?, ?)",
+                    [(chunk_id, filename, position) for position, chunk_id in enumerate(chunk_ids)]
+                )
+                self._bump_data_version()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        new_ids = set(chunk_ids)
+        return [chunk_id for chunk_id in replaced if chunk_id not in new_ids]
+
+    def remove_file(self, filename: str) -> List[str]:
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                removed = [
+                    row["chunk_id"] for row in self._conn.execute(
+                        "SELECT chunk_id FROM chunks WHERE filename = ?", (filename,)
+                    )
+                ]
+                self._conn.execute("DELETE FROM chunks WHERE filename = ?", (filename,))
+                self._conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+                self._bump_data_version()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def backup_to(self, target: Path) -> Path:
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        destination = sqlite3.connect(str(target))
+        try:
+            with self._lock:
+                self._conn.backup(destination)
+        finally:
+            destination.close()
+        return target
+
+    def migrate_from_json(self, json_path: Path = LEGACY_DATA_SOURCES_PATH) -> int:
+        json_path = Path(json_path)
+        if not json_path.exists() or not self.is_empty():
+            return 0
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        migrated = 0
+        for filename, info in data.items():
+            if not isinstance(info, dict):
+                continue
+            self.upsert_file({**info, "filename": info.get("filename", filename)})
+            migrated += 1
+
+        json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        logging.info(f"Migrated {migrated} files from {json_path} into {self.path}")
+        return migrated
+
+@lru_cache(maxsize=None)
+def get_manifest_store(path: Path = MANIFEST_DB_PATH) -> ManifestStore:
+    store = ManifestStore(path)
+    if Path(path) == MANIFEST_DB_PATH:
+        store.migrate_from_json()
+    return store
@@ -1,43 +1,198 @@
-from pinecone import Pinecone, ServerlessSpec
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterator, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import contextlib
+import threading
+import tempfile
+import hashlib
+import shutil
 import uuid
 import logging
+import json
 import os
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('vector_store.log'),
-        logging.StreamHandler()
-    ]
-)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 DEFAULT_INDEX_NAME = "ptt-hr-feedback"
 VECTOR_SIZE = 384
 DEFAULT_TOP_K = 5
+DEFAULT_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "")
+UPSERT_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 1000
+LIST_PAGE_SIZE = 100
+MATCH_PAGE_SIZE = 20
+MAX_RANKED_MATCHES = 1000
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = Path(os.getenv("LOCAL_INDEX_DIR", str(Path("data") / "local_index")))
+LOCAL_INDEX_MMAP = os.getenv("LOCAL_INDEX_MMAP", "1") == "1"
 
-class PineconeVectorStore:
-    def __init__(self, index_name: str = DEFAULT_INDEX_NAME):
+_logging_configured = False
+
+def configure_logging():
+    global _logging_configured
+    if _logging_configured:
+        return
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('vector_store.log'),
+            logging.StreamHandler()
+        ]
+    )
+    _logging_configured = True
+
+def file_id_prefix(filename: str) -> str:
+    return hashlib.md5(filename.encode("utf-8")).hexdigest()[:16] + "#"
+
+def make_chunk_ids(filename: str, count: int) -> List[str]:
+    prefix = file_id_prefix(filename)
+    return [f"{prefix}{i:06d}" for i in range(count)]
+
+@dataclass
+class MatchPage:
+    matches: List["LocalMatch"]
+    next_cursor: Optional[int]
+
+class VectorStore:
+    index_name: str
+
+    @contextlib.contextmanager
+    def batch(self):
+        yield self
+
+    def iter_match_pages(
+        self,
+        query_vector: List[float],
+        min_score: Optional[float] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        page_size: int = MATCH_PAGE_SIZE,
+        max_results: int = MAX_RANKED_MATCHES,
+        cursor: int = 0
+    ) -> Iterator[MatchPage]:
+        ranked = self.rank_ids(query_vector, max_results, min_score, metadata_filter)
+        logging.info(f"Paging {len(ranked)} ranked matches from {self.index_name} starting at cursor {cursor}")
+        while cursor < len(ranked):
+            page = ranked[cursor:cursor + page_size]
+            metadata = self.fetch_metadata([chunk_id for chunk_id, _ in page])
+            cursor += len(page)
+            yield MatchPage(
+                matches=[
+                    LocalMatch(id=chunk_id, score=score, metadata=metadata.get(chunk_id, {}))
+                    for chunk_id, score in page
+                ],
+                next_cursor=cursor if cursor < len(ranked) else None
+            )
+
+    def delete_file(self, filename: str, known_ids: Optional[List[str]] = None) -> int:
+        prefix = file_id_prefix(filename)
+        try:
+            deleted = self.delete_by_prefix(prefix)
+        except Exception as e:
+            logging.warning(f"Listing ids by prefix failed, falling back to metadata delete: {e}")
+            deleted = 0
+            if not self.delete_by_metadata({"filename": {"$eq": filename}}):
+                self.delete_vectors(known_ids or [])
+                return len(known_ids or [])
+
+        legacy_ids = [chunk_id for chunk_id in known_ids or [] if not chunk_id.startswith(prefix)]
+        self.delete_vectors(legacy_ids)
+        return deleted + len(legacy_ids)
+
+    def reconcile_orphans(
+        self,
+        find_unknown: Callable[[List[str]], List[str]],
+        batch_size: int = DELETE_BATCH_SIZE,
+        dry_run: bool = False
+    ) -> Dict[str, int]:
+        logging.info(f"Reconciling index {self.index_name} against the manifest (dry_run={dry_run})")
+        stats = {"scanned": 0, "orphans": 0, "deleted": 0}
+        pending: List[str] = []
+
+        def flush():
+            if pending and not dry_run:
+                self.delete_vectors(list(pending))
+                stats["deleted"] += len(pending)
+            pending.clear()
+
+        for ids in self.iter_ids():
+            stats["scanned"] += len(ids)
+            orphans = find_unknown(ids)
+            stats["orphans"] += len(orphans)
+            pending.extend(orphans)
+            if len(pending) >= batch_size:
+                flush()
+        flush()
+
+        logging.info(f"Reconciliation finished: {stats}")
+        return stats
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name: str = DEFAULT_INDEX_NAME, namespace: str = DEFAULT_NAMESPACE, skip_index_check: bool = False):
+        from pinecone import Pinecone, ServerlessSpec
+
+        configure_logging()
         logging.info(f"Initializing PineconeVectorStore with index={index_name}")
         self.index_name = index_name
+        self.namespace = namespace
         self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
         spec = ServerlessSpec(cloud="aws", region="us-east-1")
-        if self.index_name not in [i.name for i in self.pc.list_indexes()]:
+        if not skip_index_check and self.index_name not in [i.name for i in self.pc.list_indexes()]:
             self.pc.create_index(name=self.index_name, dimension=VECTOR_SIZE, metric="cosine", spec=spec)
         self.index = self.pc.Index(self.index_name)
         logging.info(f"Successfully initialized Pinecone index {self.index_name}")
 
-    def search_vectors(self, query_vector: List[float], top_k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+    def search_vectors(self, query_vector: List[float], top_k: int = DEFAULT_TOP_K, include_values: bool = False) -> List[Dict[str, Any]]:
         logging.info(f"Starting vector search with top_k={top_k}")
         logging.debug(f"Query vector length: {len(query_vector)}")
         if len(query_vector) != VECTOR_SIZE:
             logging.error(f"Query vector dimension mismatch! Expected {VECTOR_SIZE}, got {len(query_vector)}")
             raise ValueError(f"Query vector size {len(query_vector)} does not match expected {VECTOR_SIZE}")
-        results = self.index.query(vector=query_vector, top_k=top_k, include_metadata=True)
+        results = self.index.query(
+            vector=query_vector, top_k=top_k, include_metadata=True, include_values=include_values, namespace=self.namespace
+        )
         logging.info(f"Search completed successfully. Found {len(results.matches)} results")
         return results.matches
 
+    def rank_ids(
+        self,
+        query_vector: List[float],
+        limit: int = MAX_RANKED_MATCHES,
+        min_score: Optional[float] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        kwargs = {"namespace": self.namespace, "include_metadata": False, "include_values": False}
+        if metadata_filter:
+            kwargs["filter"] = metadata_filter
+        results = self.index.query(vector=query_vector, top_k=limit, **kwargs)
+        return [
+            (match.id, match.score) for match in results.matches
+            if min_score is None or match.score >= min_score
+        ]
+
+    def fetch_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        vectors = self.index.fetch(ids=ids, namespace=self.namespace).vectors
+        return {chunk_id: dict(vector.metadata or {}) for chunk_id, vector in vectors.items()}
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        if not ids:
+            return {}
+        vectors = self.index.fetch(ids=ids, namespace=self.namespace).vectors
+        return {chunk_id: list(vector.values) for chunk_id, vector in vectors.items()}
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        logging.info(f"Updating metadata of {len(updates)} vectors in index {self.index_name}")
+        for chunk_id, metadata in updates.items():
+            self.index.update(id=chunk_id, set_metadata=metadata, namespace=self.namespace)
+
     def insert_vectors(
         self,
         vectors: List[List[float]],
@@ -53,11 +208,378 @@ class PineconeVectorStore:
         if payloads is None:
             payloads = [{} for _ in vectors]
         to_upsert = list(zip(ids, vectors, payloads))
-        self.index.upsert(vectors=to_upsert)
+        for start in range(0, len(to_upsert), UPSERT_BATCH_SIZE):
+            self.index.upsert(vectors=to_upsert[start:start + UPSERT_BATCH_SIZE], namespace=self.namespace)
         logging.info(f"Successfully inserted {len(vectors)} vectors")
 
     def delete_vectors(self, ids: List[str]):
         logging.info(f"Deleting {len(ids)} vectors from index {self.index_name}")
         if ids:
-            self.index.delete(ids=ids)
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                self.index.delete(ids=ids[start:start + DELETE_BATCH_SIZE], namespace=self.namespace)
             logging.info(f"Successfully deleted {len(ids)} vectors")
+
+    def iter_ids(self, prefix: Optional[str] = None) -> Iterator[List[str]]:
+        kwargs = {"namespace": self.namespace, "limit": LIST_PAGE_SIZE}
+        if prefix:
+            kwargs["prefix"] = prefix
+        for page in self.index.list(**kwargs):
+            if page:
+                yield list(page)
+
+    def delete_by_prefix(self, prefix: str) -> int:
+        logging.info(f"Deleting vectors with id prefix {prefix} from index {self.index_name}")
+        deleted = 0
+        for ids in self.iter_ids(prefix=prefix):
+            self.index.delete(ids=ids, namespace=self.namespace)
+            deleted += len(ids)
+        logging.info(f"Successfully deleted {deleted} vectors with id prefix {prefix}")
+        return deleted
+
+    def delete_by_metadata(self, metadata_filter: Dict[str, Any]) -> bool:
+        logging.info(f"Deleting vectors matching {metadata_filter} from index {self.index_name}")
+        try:
+            self.index.delete(filter=metadata_filter, namespace=self.namespace)
+        except Exception as e:
+            logging.warning(f"Delete by metadata is not supported by index {self.index_name}: {e}")
+            return False
+        return True
+
+    def delete_namespace(self, namespace: Optional[str] = None):
+        namespace = self.namespace if namespace is None else namespace
+        logging.info(f"Deleting namespace '{namespace}' from index {self.index_name}")
+        self.index.delete(delete_all=True, namespace=namespace)
+
+
+@dataclass
+class LocalMatch:
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    values: Optional[List[float]] = None
+
+def _matches_filter(metadata: Dict[str, Any], metadata_filter: Dict[str, Any]) -> bool:
+    for key, condition in metadata_filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, index_dir: Path = LOCAL_INDEX_DIR, mmap: bool = LOCAL_INDEX_MMAP):
+        configure_logging()
+        self.index_dir = Path(index_dir)
+        self.mmap = mmap
+        self.index_name = f"local:{self.index_dir}"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        with self._file_lock(exclusive=False):
+            self._load()
+        logging.info(f"Initialized LocalVectorStore at {self.index_dir} with {len(self._ids)} vectors")
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.index_dir / "vectors.npy"
+
+    @property
+    def records_path(self) -> Path:
+        return self.index_dir / "records.json"
+
+    @property
+    def norms_path(self) -> Path:
+        return self.index_dir / "norms.npy"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.index_dir / ".lock"
+
+    def _disk_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.records_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load(self):
+        with self._lock:
+            self._stamp = self._disk_stamp()
+            if self._stamp is not None and self.vectors_path.exists():
+                self._vectors = np.load(self.vectors_path, mmap_mode="c" if self.mmap else None)
+                with open(self.records_path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+                self._ids = [record["id"] for record in records]
+                self._metadata = [record["metadata"] for record in records]
+            else:
+                self._vectors = np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+                self._ids = []
+                self._metadata = []
+            norms = np.load(self.norms_path, mmap_mode="r" if self.mmap else None) if self.norms_path.exists() else None
+            self._reindex(norms if norms is not None and len(norms) == len(self._ids) else None)
+
+    def _refresh(self):
+        if self._batch_depth or self._disk_stamp() == self._stamp:
+            return
+        with self._file_lock(exclusive=False):
+            self._load()
+        logging.info(f"Reloaded {self.index_name} after an external write ({len(self._ids)} vectors)")
+
+    def _reindex(self, norms: Optional[np.ndarray] = None):
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+        if norms is None:
+            norms = np.linalg.norm(self._vectors, axis=1) if len(self._vectors) else np.zeros(0, dtype=np.float32)
+            norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+        self._norms = norms
+
+    def _stage(self, target: Path, write: Callable[[Any], None]) -> Path:
+        fd, tmp_name = tempfile.mkstemp(dir=self.index_dir, prefix=f".{target.name}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        return Path(tmp_name)
+
+    def _save(self):
+        records = [{"id": i, "metadata": m} for i, m in zip(self._ids, self._metadata)]
+        staged = []
+        try:
+            staged.append((self._stage(self.vectors_path, lambda f: np.save(f, self._vectors)), self.vectors_path))
+            staged.append((self._stage(self.norms_path, lambda f: np.save(f, self._norms)), self.norms_path))
+            staged.append((
+                self._stage(self.records_path, lambda f: f.write(json.dumps(records, ensure_ascii=False).encode("utf-8"))),
+                self.records_path
+            ))
+            with self._lock:
+                for tmp_path, target in staged:
+                    os.replace(tmp_path, target)
+                self._stamp = self._disk_stamp()
+                self._dirty = False
+        finally:
+            for tmp_path, _ in staged:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+
+    @contextlib.contextmanager
+    def batch(self):
+        with self._write_lock:
+            outer = self._batch_depth == 0
+            with self._file_lock(exclusive=True) if outer else contextlib.nullcontext():
+                if outer and self._disk_stamp() != self._stamp:
+                    self._load()
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    try:
+                        if outer and self._dirty:
+                            self._save()
+                    finally:
+                        self._batch_depth -= 1
+
+    def count(self) -> int:
+        self._refresh()
+        with self._lock:
+            return len(self._ids)
+
+    def export_files(self, target_dir: Path) -> List[Path]:
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        with self.batch():
+            if self._stamp is None or self._dirty:
+                self._save()
+            return [
+                Path(shutil.copy2(path, target_dir / path.name))
+                for path in (self.vectors_path, self.norms_path, self.records_path)
+            ]
+
+    def search_vectors(self, query_vector: List[float], top_k: int = DEFAULT_TOP_K, include_values: bool = False) -> List[LocalMatch]:
+        if len(query_vector) != VECTOR_SIZE:
+            raise ValueError(f"Query vector size {len(query_vector)} does not match expected {VECTOR_SIZE}")
+        query = np.asarray(query_vector, dtype=np.float32)
+        self._refresh()
+        with self._lock:
+            if not self._ids:
+                return []
+            scores = (self._vectors @ query) / (self._norms * max(float(np.linalg.norm(query)), 1e-12))
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                LocalMatch(
+                    id=self._ids[i],
+                    score=float(scores[i]),
+                    metadata=dict(self._metadata[i]),
+                    values=self._vectors[i].tolist() if include_values else None
+                )
+                for i in top
+            ]
+
+    def rank_ids(
+        self,
+        query_vector: List[float],
+        limit: int = MAX_RANKED_MATCHES,
+        min_score: Optional[float] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        self._refresh()
+        with self._lock:
+            if not self._ids:
+                return []
+            scores = (self._vectors @ query) / (self._norms * max(float(np.linalg.norm(query)), 1e-12))
+            candidates = np.arange(len(scores))
+            if metadata_filter:
+                candidates = np.array(
+                    [i for i in candidates if _matches_filter(self._metadata[i], metadata_filter)],
+                    dtype=np.int64
+                )
+            if min_score is not None:
+                candidates = candidates[scores[candidates] >= min_score]
+            ordered = candidates[np.argsort(-scores[candidates], kind="stable")][:limit]
+            return [(self._ids[i], float(scores[i])) for i in ordered]
+
+    def fetch_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        self._refresh()
+        with self._lock:
+            return {
+                chunk_id: dict(self._metadata[self._positions[chunk_id]])
+                for chunk_id in ids if chunk_id in self._positions
+            }
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        self._refresh()
+        with self._lock:
+            return {
+                chunk_id: self._vectors[self._positions[chunk_id]].tolist()
+                for chunk_id in ids if chunk_id in self._positions
+            }
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        with self.batch(), self._lock:
+            for chunk_id, metadata in updates.items():
+                position = self._positions.get(chunk_id)
+                if position is not None:
+                    self._metadata[position] = {**self._metadata[position], **metadata}
+                    self._dirty = True
+
+    def insert_vectors(
+        self,
+        vectors: List[List[float]],
+        ids: Optional[List[str]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ):
+        if not vectors:
+            return
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in vectors]
+        if payloads is None:
+            payloads = [{} for _ in vectors]
+        array = np.asarray(vectors, dtype=np.float32)
+
+        with self.batch(), self._lock:
+            new_rows = []
+            for chunk_id, vector, payload in zip(ids, array, payloads):
+                position = self._positions.get(chunk_id)
+                if position is None:
+                    self._positions[chunk_id] = len(self._ids) + len(new_rows)
+                    new_rows.append((chunk_id, vector, payload))
+                else:
+                    self._vectors[position] = vector
+                    self._metadata[position] = payload
+            if new_rows:
+                self._ids.extend(row[0] for row in new_rows)
+                self._metadata.extend(row[2] for row in new_rows)
+                self._vectors = np.vstack([self._vectors, np.stack([row[1] for row in new_rows])])
+            self._reindex()
+            self._dirty = True
+        logging.info(f"Inserted {len(vectors)} vectors into {self.index_name}")
+
+    def delete_vectors(self, ids: List[str]):
+        if not ids:
+            return
+        with self.batch(), self._lock:
+            doomed = {self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions}
+            if not doomed:
+                return
+            keep = [i for i in range(len(self._ids)) if i not in doomed]
+            self._vectors = self._vectors[keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._metadata = [self._metadata[i] for i in keep]
+            self._reindex()
+            self._dirty = True
+        logging.info(f"Deleted {len(doomed)} vectors from {self.index_name}")
+
+    def iter_ids(self, prefix: Optional[str] = None) -> Iterator[List[str]]:
+        self._refresh()
+        with self._lock:
+            ids = [chunk_id for chunk_id in self._ids if not prefix or chunk_id.startswith(prefix)]
+        for start in range(0, len(ids), LIST_PAGE_SIZE):
+            yield ids[start:start + LIST_PAGE_SIZE]
+
+    def delete_by_prefix(self, prefix: str) -> int:
+        ids = [chunk_id for page in self.iter_ids(prefix=prefix) for chunk_id in page]
+        self.delete_vectors(ids)
+        return len(ids)
+
+    def delete_by_metadata(self, metadata_filter: Dict[str, Any]) -> bool:
+        self._refresh()
+        with self._lock:
+            ids = [i for i, m in zip(self._ids, self._metadata) if _matches_filter(m, metadata_filter)]
+        self.delete_vectors(ids)
+        return True
+
+    def delete_namespace(self, namespace: Optional[str] = None):
+        with self.batch(), self._lock:
+            self._vectors = np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+            self._ids = []
+            self._metadata = []
+            self._reindex()
+            self._dirty = True
+
+@lru_cache(maxsize=None)
+def _shared_vector_store(backend: str, **kwargs) -> VectorStore:
+    if backend == "local":
+        return LocalVectorStore(**kwargs)
+    if backend == "pinecone":
+        return PineconeVectorStore(**kwargs)
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+def get_vector_store(backend: Optional[str] = None, **kwargs) -> VectorStore:
+    return _shared_vector_store(backend or VECTOR_STORE_BACKEND, **kwargs)
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from core.manifest_store import get_manifest_store
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Garbage-collect vectors that are not in the ingest manifest")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default=VECTOR_STORE_BACKEND)
+    parser.add_argument("--index-name", default=DEFAULT_INDEX_NAME)
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+    parser.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        store = LocalVectorStore()
+    else:
+        store = PineconeVectorStore(index_name=args.index_name, namespace=args.namespace)
+    print(store.reconcile_orphans(get_manifest_store().unknown_chunk_ids, batch_size=args.batch_size, dry_run=args.dry_run))
@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any
+from dotenv import load_dotenv
+import argparse
+import logging
+import json
+import time
+import os
+
+load_dotenv()
+
+from logic.ingestion import prepare_workbook, index_prepared_file, get_file_hash, PreparedFile
+from logic.summarization import INGEST_SUMMARIES
+from logic.deduplication import INGEST_DEDUP
+from core.dedup_index import NearDuplicateIndex, DEDUP_INDEX_PATH
+from logic.embedding import get_embedding_model
+from core.vector_store import get_vector_store, configure_logging, DEFAULT_INDEX_NAME, DEFAULT_NAMESPACE, LOCAL_INDEX_DIR
+from core.manifest_store import ManifestStore, MANIFEST_DB_PATH
+
+WORKBOOK_PATTERNS = ("*.xlsx", "*.xls")
+DEFAULT_CHECKPOINT_PATH = Path("data") / "ingest_checkpoint.json"
+DEFAULT_FLUSH_EVERY = 50
+
+def collect_workbooks(paths: List[Path]) -> List[Path]:
+    workbooks = []
+    for path in paths:
+        if path.is_dir():
+            for pattern in WORKBOOK_PATTERNS:
+                workbooks.extend(p for p in path.rglob(pattern) if not p.name.startswith("~$"))
+        elif path.is_file():
+            workbooks.append(path)
+        else:
+            logging.warning(f"Skipping {path}: not a file or directory")
+    return sorted(set(workbooks))
+
+def load_checkpoint(path: Path) -> Dict[str, str]:
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path: Path, checkpoint: Dict[str, str]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def run_ingest(args: argparse.Namespace) -> Dict[str, Any]:
+    configure_logging()
+    started = time.perf_counter()
+
+    if args.backend == "local":
+        vector_store = get_vector_store("local", index_dir=args.local_dir)
+    else:
+        vector_store = get_vector_store("pinecone", index_name=args.index_name, namespace=args.namespace)
+    manifest = ManifestStore(args.manifest)
+    checkpoint = load_checkpoint(args.checkpoint)
+    embeddings = get_embedding_model()
+    dedup_index = NearDuplicateIndex(args.dedup_index) if args.dedup or args.dedup_index.exists() else None
+
+    summary = {"files": 0, "skipped": 0, "failed": 0, "rows": 0, "chunks": 0, "duplicates": 0}
+    pending = {}
+    seen_names = {}
+
+    for path in collect_workbooks(args.paths):
+        if path.name in seen_names:
+            logging.warning(f"Skipping {path}: a workbook named {path.name} was already queued from {seen_names[path.name]}")
+            summary["skipped"] += 1
+            continue
+        seen_names[path.name] = path
+
+        file_hash = get_file_hash(path.read_bytes())
+        existing = manifest.get_file(path.name)
+        already_done = checkpoint.get(str(path)) == file_hash or (existing and existing["file_hash"] == file_hash)
+        if already_done and not args.force:
+            logging.info(f"Skipping {path}: already ingested")
+            summary["skipped"] += 1
+            continue
+        pending[path] = file_hash
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(prepare_workbook, path, path.name, file_hash): path
+            for path, file_hash in pending.items()
+        }
+        completed = as_completed(futures)
+        while True:
+            group = list(islice(completed, args.flush_every))
+            if not group:
+                break
+
+            indexed = []
+            with vector_store.batch():
+                for future in group:
+                    path = futures[future]
+                    try:
+                        prepared: PreparedFile = future.result()
+                        file_info = index_prepared_file(
+                            prepared, vector_store, embeddings,
+                            summarize=args.summaries, dedup=args.dedup, dedup_index=dedup_index
+                        )
+                    except Exception as e:
+                        logging.error(f"Failed to ingest {path}: {e}")
+                        summary["failed"] += 1
+                        continue
+                    indexed.append((path, prepared, file_info))
+
+            with vector_store.batch():
+                for path, prepared, file_info in indexed:
+                    try:
+                        replaced_chunk_ids = manifest.upsert_file(file_info)
+                        vector_store.delete_vectors(replaced_chunk_ids)
+                    except Exception as e:
+                        logging.error(f"Failed to ingest {path}: {e}")
+                        summary["failed"] += 1
+                        continue
+
+                    checkpoint[str(path)] = prepared.file_hash
+                    summary["files"] += 1
+                    summary["rows"] += prepared.rows
+                    summary["chunks"] += len(prepared.chunks)
+                    summary["duplicates"] += file_info["duplicates"]
+                    logging.info(f"Ingested {path} ({prepared.rows} rows, {len(prepared.chunks)} chunks)")
+            save_checkpoint(args.checkpoint, checkpoint)
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+    summary["rows_per_second"] = round(summary["rows"] / elapsed, 2) if elapsed else 0.0
+    summary["chunks_per_second"] = round(summary["chunks"] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-ingest HR feedback workbooks into the vector store")
+    parser.add_argument("paths", nargs="+", type=Path, help="Workbook files or directories to scan recursively")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--index-name", default=DEFAULT_INDEX_NAME)
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+    parser.add_argument("--local-dir", type=Path, default=LOCAL_INDEX_DIR)
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_DB_PATH)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT_PATH)
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY, help="Workbooks to index before the local index is written to disk")
+    parser.add_argument("--force", action="store_true", help="Re-ingest workbooks that were already ingested")
+    parser.add_argument("--dedup", action="store_true", default=INGEST_DEDUP, help="Collapse near-duplicate records across workbooks")
+    parser.add_argument("--dedup-index", type=Path, default=DEDUP_INDEX_PATH)
+    parser.add_argument("--summaries", action="store_true", default=INGEST_SUMMARIES, help="Precompute per-record summaries with the LLM")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    summary = run_ingest(parse_args())
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
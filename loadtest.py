@@ -0,0 +1,328 @@
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+from collections import defaultdict
+import numpy as np
+import contextlib
+import threading
+import tempfile
+import argparse
+import resource
+import logging
+import shelve
+import random
+import json
+import time
+import io
+import os
+import sys
+
+REPO_DIR = Path(__file__).resolve().parent
+APP_FILE = REPO_DIR / "app.py"
+DEFAULT_SESSIONS = 8
+DEFAULT_TURNS = 6
+DEFAULT_UPLOADERS = 2
+DEFAULT_UPLOAD_ROWS = 200
+DEFAULT_TIMEOUT = 120.0
+SCRIPT_RUN_RETRIES = 3
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+QUESTIONS = [
+    "ข้อมูล Career Path ในระบบ COACH",
+    "สถานะการแก้ไขของ CNBO",
+    "แล้วสถานะล่าสุดล่ะ",
+    "สอบถามสิทธิประโยชน์ของผู้เข้าร่วม secondment",
+    "หลักการคัดเข้า และคัดออก DM Pool",
+    "ขอข้อมูลทั้งหมด Training"
+]
+FAKE_ENV = {
+    "QA_LLM_BACKEND": "fake",
+    "EMBEDDING_BACKEND": "fake",
+    "VECTOR_STORE_BACKEND": "local",
+    "SNAPSHOT_RESTORE_ON_BOOT": "0",
+    "QUERY_API_URL": ""
+}
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(float(max(values)), 1)
+    }
+
+class HarnessError(Exception):
+    pass
+
+def allow_concurrent_app_tests():
+    import streamlit
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.testing.v1 import app_test
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+
+    if getattr(Runtime, "_loadtest_shared", None) is not None:
+        return
+    for owner, name in [(Runtime, "_instance"), (Runtime, "instance"), (Runtime, "exists"), (app_test, "patch_config_options")]:
+        if not hasattr(owner, name):
+            raise HarnessError(
+                f"streamlit {streamlit.__version__} has no {owner.__name__}.{name}; "
+                "the shared-runtime shim in loadtest.py needs updating for this version"
+            )
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._loadtest_shared = shared
+    Runtime.exists = classmethod(lambda cls: True)
+    Runtime.instance = classmethod(lambda cls: cls._instance if cls._instance is not None else cls._loadtest_shared)
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+def make_workbook(rows: int, seed: int) -> bytes:
+    from logic.processing_benchmark import make_sample_sheet
+
+    buffer = io.BytesIO()
+    make_sample_sheet(rows, extra_columns=2, seed=seed).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+class SimulatedSession:
+    def __init__(self, number: int, turns: int, upload: Optional[bytes], timeout: float, seed: int):
+        from utils.auth import issue_session_token
+
+        self.number = number
+        self.turns = turns
+        self.upload = upload
+        self.timeout = timeout
+        self.random = random.Random(seed + number)
+        self.token = issue_session_token("loadtest", "hr_user")
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.sent: List[str] = []
+        self.accepted: List[str] = []
+        self.app_errors: List[str] = []
+        self.harness_errors: List[str] = []
+        self.script_retries = 0
+        self.app = None
+
+    def _rendered(self) -> bool:
+        return bool(self.app.main.children or self.app.sidebar.children)
+
+    def _run(self, action: str, prepare: Optional[Callable[[], Any]] = None):
+        for attempt in range(SCRIPT_RUN_RETRIES + 1):
+            if attempt and prepare:
+                self.app.run(timeout=self.timeout)
+                if not self._rendered():
+                    self.script_retries += 1
+                    continue
+            element = prepare() if prepare else None
+            started = time.perf_counter()
+            (element or self.app).run(timeout=self.timeout)
+            if self._rendered():
+                self.latencies[action].append((time.perf_counter() - started) * 1000)
+                self.app_errors.extend(f"{action}: {e.value}" for e in self.app.exception)
+                self.app_errors.extend(f"{action}: {e.value}" for e in self.app.error)
+                return
+            self.script_retries += 1
+        raise HarnessError(f"{action}: the script produced no output after {SCRIPT_RUN_RETRIES + 1} runs")
+
+    def _button(self, label: str):
+        for button in self.app.button:
+            if button.label == label:
+                return button
+        raise HarnessError(f"No '{label}' button on the page")
+
+    def login(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(str(APP_FILE), default_timeout=self.timeout)
+        self.app.session_state["auth_token"] = self.token
+        self._run("login")
+
+    def upload_file(self):
+        name = f"loadtest_{self.number}.xlsx"
+        self._run("upload_select", lambda: self.app.sidebar.file_uploader[0].set_value((name, self.upload, XLSX_MIME)))
+        self._run("upload_process", lambda: self._button("Process Files").click())
+
+    def new_chat(self):
+        self._run("new_chat", lambda: self._button("➕ New Chat").click())
+
+    def switch_chat(self):
+        buttons = [button for button in self.app.button if button.key and button.key.startswith("load_")]
+        if buttons:
+            key = self.random.choice(buttons).key
+            self._run("switch_chat", lambda: self.app.button(key).click())
+
+    def chat(self, turn: int):
+        message = f"[loadtest s{self.number} t{turn}] {self.random.choice(QUESTIONS)}"
+        self.sent.append(message)
+        self._run("chat", lambda: self.app.chat_input[0].set_value(message))
+        if any(element.value == message for element in self.app.markdown):
+            self.accepted.append(message)
+
+    def _step(self, action: str, fn: Callable[[], None]) -> bool:
+        try:
+            fn()
+            return True
+        except Exception as e:
+            self.harness_errors.append(f"{action}: {type(e).__name__}: {e}")
+            return False
+
+    def run(self, barrier: threading.Barrier):
+        logged_in = self._step("login", self.login)
+        try:
+            barrier.wait(timeout=self.timeout * 2)
+        except threading.BrokenBarrierError:
+            self.harness_errors.append("start barrier broken; running without a synchronized start")
+        if not logged_in:
+            return
+        if self.upload:
+            self._step("upload", self.upload_file)
+        self._step("new_chat", self.new_chat)
+        for turn in range(self.turns):
+            self._step("chat", lambda: self.chat(turn))
+            if turn % 3 == 2:
+                self._step("switch_chat", self.switch_chat)
+
+def seed_index(rows: int, seed: int) -> str:
+    from core.vector_store import get_vector_store
+    from core.manifest_store import get_manifest_store
+    from logic.ingestion import prepare_workbook, index_prepared_file, get_file_hash
+    from logic.embedding import get_embedding_model
+
+    content = make_workbook(rows, seed)
+    path = Path("data") / "uploads" / "loadtest_seed.xlsx"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    prepared = prepare_workbook(path, filename=path.name, file_hash=get_file_hash(content))
+    get_manifest_store().upsert_file(index_prepared_file(prepared, get_vector_store(), get_embedding_model()))
+    return path.name
+
+def persisted_user_messages(chat_db: str) -> List[str]:
+    with shelve.open(chat_db) as db:
+        chats = db.get("chats", {})
+    return [message["content"] for messages in chats.values() for message in messages if message["role"] == "user"]
+
+def run_load_test(
+    sessions: int = DEFAULT_SESSIONS,
+    turns: int = DEFAULT_TURNS,
+    uploaders: int = DEFAULT_UPLOADERS,
+    upload_rows: int = DEFAULT_UPLOAD_ROWS,
+    timeout: float = DEFAULT_TIMEOUT,
+    seed: int = 0
+) -> Dict[str, Any]:
+    from app import CHAT_DB
+    from utils.startup import warm_up_in_background
+
+    allow_concurrent_app_tests()
+    warm_up_in_background().join()
+    persisted_user_messages(CHAT_DB)
+    seed_index(upload_rows, seed)
+    workbooks = [make_workbook(upload_rows, seed + i + 1) for i in range(min(uploaders, sessions))]
+    baseline_mb = rss_mb()
+
+    simulated = [
+        SimulatedSession(i, turns, workbooks[i] if i < len(workbooks) else None, timeout, seed)
+        for i in range(sessions)
+    ]
+    barrier = threading.Barrier(sessions + 1)
+    threads = [threading.Thread(target=session.run, args=(barrier,), name=f"session-{session.number}") for session in simulated]
+    for thread in threads:
+        thread.start()
+    try:
+        barrier.wait(timeout=timeout * 2)
+    except threading.BrokenBarrierError:
+        pass
+    logged_in_mb = rss_mb()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    final_mb = rss_mb()
+
+    by_action: Dict[str, List[float]] = defaultdict(list)
+    for session in simulated:
+        for action, values in session.latencies.items():
+            by_action[action].extend(values)
+    work_turns = [value for action, values in by_action.items() if action != "login" for value in values]
+
+    sent = [message for session in simulated for message in session.sent]
+    accepted = [message for session in simulated for message in session.accepted]
+    try:
+        persisted, chat_db_error = set(persisted_user_messages(CHAT_DB)), None
+    except Exception as e:
+        persisted, chat_db_error = set(), f"{type(e).__name__}: {e}"
+    lost = [message for message in accepted if message not in persisted]
+    app_errors = [f"s{session.number} {error}" for session in simulated for error in session.app_errors]
+    harness_errors = [f"s{session.number} {error}" for session in simulated for error in session.harness_errors]
+
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "uploaders": len(workbooks),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_turns_per_second": round(len(work_turns) / elapsed, 2) if elapsed else 0.0,
+        "latency": percentiles(work_turns),
+        "latency_by_action": {action: percentiles(values) for action, values in sorted(by_action.items())},
+        "memory": {
+            "baseline_mb": round(baseline_mb, 1),
+            "after_login_mb": round(logged_in_mb, 1),
+            "final_mb": round(final_mb, 1),
+            "per_session_login_mb": round((logged_in_mb - baseline_mb) / sessions, 2),
+            "per_session_total_mb": round((final_mb - baseline_mb) / sessions, 2)
+        },
+        "chat_writes": {
+            "sent": len(sent),
+            "accepted": len(accepted),
+            "persisted": len(accepted) - len(lost),
+            "lost": len(lost),
+            "lost_messages": lost[:20],
+            "read_error": chat_db_error
+        },
+        "app_errors": len(app_errors),
+        "app_error_samples": app_errors[:20],
+        "harness_errors": len(harness_errors),
+        "harness_error_samples": harness_errors[:20],
+        "script_retries": sum(session.script_retries for session in simulated)
+    }
+
+def prepare_workdir(workdir: Optional[Path]) -> Path:
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="hr-chatbot-loadtest-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    icon_dir = workdir / "icon"
+    if not icon_dir.exists() and (REPO_DIR / "icon").exists():
+        icon_dir.symlink_to(REPO_DIR / "icon", target_is_directory=True)
+    os.environ.update({**FAKE_ENV, "LOCAL_INDEX_DIR": str(workdir / "data" / "local_index")})
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_DIR))
+    return workdir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent Streamlit sessions against fake backends")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="Chat turns per session")
+    parser.add_argument("--uploaders", type=int, default=DEFAULT_UPLOADERS, help="Sessions that upload a workbook first")
+    parser.add_argument("--upload-rows", type=int, default=DEFAULT_UPLOAD_ROWS)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", type=Path, default=None, help="Scratch directory for chats, index and uploads")
+    args = parser.parse_args()
+
+    workdir = prepare_workdir(args.workdir)
+    logging.disable(logging.INFO)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    report = run_load_test(args.sessions, args.turns, args.uploaders, args.upload_rows, args.timeout, args.seed)
+    print(json.dumps({"workdir": str(workdir), **report}, ensure_ascii=False, indent=2))
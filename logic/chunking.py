@@ -1,19 +1,39 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
+from typing import Dict, List, Tuple
+from logic.data_processing import SELECTED_COLUMNS
 import pandas as pd
+import re
+
+_FIELD_PATTERN = re.compile(
+    r"^(" + "|".join(re.escape(col.strip()) for col in sorted(SELECTED_COLUMNS, key=len, reverse=True)) + r")\s*: ?(.*)$"
+)
+
+def format_record(row: pd.Series, selected_columns: List[str]) -> str:
+    row_text = []
+    for col in selected_columns:
+        value = str(row.get(col, "")).strip()
+        if value and value.lower() != 'nan' and value != 'ไม่มีข้อมูล' and not pd.isna(value):
+            row_text.append(f"{col}: {value}")
+    return "\n".join(row_text)
+
+def parse_record_text(text: str) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    current = None
+    for line in text.splitlines():
+        match = _FIELD_PATTERN.match(line)
+        if match:
+            current = match.group(1)
+            fields[current] = match.group(2).strip()
+        elif current:
+            fields[current] = f"{fields[current]}\n{line}".strip()
+    return fields
 
 def create_text_chunks(df_processed: pd.DataFrame, selected_columns: List[str]) -> List[str]:
     text_chunks = []
 
     for idx, row in df_processed.iterrows():
-        row_text = []
-        for col in selected_columns:
-            value = str(row.get(col, "")).strip()
-            if value and value.lower() != 'nan' and value != 'ไม่มีข้อมูล' and not pd.isna(value):
-                row_text.append(f"{col}: {value}")
-
-        if row_text:
-            chunk_text = "\n".join(row_text)
+        chunk_text = format_record(row, selected_columns)
+        if chunk_text:
             text_chunks.append(chunk_text)
 
     return text_chunks
@@ -39,4 +59,15 @@ def chunk_texts_intelligently(
             sub_chunks = text_splitter.split_text(text)
             final_chunks.extend(sub_chunks)
 
-    return final_chunks
\ No newline at end of file
+    return final_chunks
+
+def create_record_chunks(
+    record_texts: List[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200
+) -> List[Tuple[int, str]]:
+    record_chunks = []
+    for record_index, text in enumerate(record_texts):
+        for chunk in chunk_texts_intelligently([text], chunk_size, chunk_overlap):
+            record_chunks.append((record_index, chunk))
+    return record_chunks
@@ -0,0 +1,200 @@
+from concurrent.futures import Future
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Hashable, Iterator, List, Optional
+from logic.embedding import normalize_query
+import threading
+import time
+import os
+
+COALESCE_TIMEOUT_SECONDS = float(os.getenv("COALESCE_TIMEOUT_SECONDS", "120"))
+MAX_LEADER_CONTEXTS = 256
+
+class _Broadcast:
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, token: str):
+        with self.condition:
+            self.tokens.append(token)
+            self.condition.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def subscribe(self, timeout: float) -> Iterator[str]:
+        position = 0
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + timeout
+                while position >= len(self.tokens) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for the shared answer stream")
+                    self.condition.wait(remaining)
+                pending = self.tokens[position:]
+                finished, error = self.done, self.error
+            position += len(pending)
+            yield from pending
+            if finished and position >= len(self.tokens):
+                if error:
+                    raise error
+                return
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._leaders = 0
+        self._followers = 0
+
+    def _forget(self, table: Dict[Hashable, Any], key: Hashable, value: Any):
+        with self._lock:
+            if table.get(key) is value:
+                del table[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = COALESCE_TIMEOUT_SECONDS) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                self._leaders += 1
+                future = Future()
+                self._calls[key] = future
+            else:
+                self._followers += 1
+        if not leader:
+            return future.result(timeout=timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(self._calls, key, future)
+
+    def do_stream(
+        self,
+        key: Hashable,
+        fn: Callable[[], Iterator[str]],
+        timeout: float = COALESCE_TIMEOUT_SECONDS
+    ) -> Iterator[str]:
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                self._leaders += 1
+                broadcast = _Broadcast()
+                self._streams[key] = broadcast
+            else:
+                self._followers += 1
+                broadcast.followers += 1
+        if leader:
+            yield from self._pump(key, broadcast, fn)
+        else:
+            yield from broadcast.subscribe(timeout)
+
+    def _pump(self, key: Hashable, broadcast: _Broadcast, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        error = None
+        try:
+            tokens = fn()
+            for token in tokens:
+                broadcast.publish(token)
+                yield token
+        except GeneratorExit:
+            self._forget(self._streams, key, broadcast)
+            if broadcast.followers:
+                try:
+                    for token in tokens:
+                        broadcast.publish(token)
+                except Exception as e:
+                    error = e
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._forget(self._streams, key, broadcast)
+            broadcast.finish(error=error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._leaders + self._followers
+            return {
+                "leaders": self._leaders,
+                "coalesced": self._followers,
+                "coalesced_rate": self._followers / total if total else 0.0,
+                "in_flight": len(self._calls) + len(self._streams)
+            }
+
+SINGLE_FLIGHT = SingleFlight()
+
+class CoalescingQAChain:
+    def __init__(
+        self,
+        qa_chain,
+        data_version: Callable[[], Any] = lambda: 0,
+        single_flight: SingleFlight = SINGLE_FLIGHT,
+        timeout: float = COALESCE_TIMEOUT_SECONDS
+    ):
+        self.qa_chain = qa_chain
+        self.data_version = data_version
+        self.single_flight = single_flight
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._leader_contexts: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def _key(self, query: str, retrieval_context=None) -> Hashable:
+        context_key = retrieval_context.fingerprint() if retrieval_context is not None else None
+        return (normalize_query(query), self.data_version(), context_key)
+
+    def _lead(self, key: Hashable, retrieval_context) -> Any:
+        if retrieval_context is not None:
+            with self._lock:
+                self._leader_contexts[key] = retrieval_context
+                while len(self._leader_contexts) > MAX_LEADER_CONTEXTS:
+                    self._leader_contexts.popitem(last=False)
+        return retrieval_context
+
+    def _follow(self, key: Hashable, retrieval_context):
+        if retrieval_context is None:
+            return
+        with self._lock:
+            leader = self._leader_contexts.get(key)
+        if leader is not None and leader is not retrieval_context:
+            retrieval_context.adopt(leader)
+
+    def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        from logic.qa_chain import answer_query
+
+        query, retrieval_context = inputs["query"], inputs.get("retrieval_context")
+        key = self._key(query, retrieval_context)
+        result = self.single_flight.do(
+            key,
+            lambda: answer_query(self.qa_chain, query, self._lead(key, retrieval_context)),
+            self.timeout
+        )
+        self._follow(key, retrieval_context)
+        return result
+
+    def stream(self, query: str, retrieval_context=None) -> Iterator[str]:
+        from logic.qa_chain import stream_answer
+
+        key = ("stream",) + self._key(query, retrieval_context)
+        yield from self.single_flight.do_stream(
+            key,
+            lambda: stream_answer(self.qa_chain, query, self._lead(key, retrieval_context)),
+            self.timeout
+        )
+        self._follow(key, retrieval_context)
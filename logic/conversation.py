@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from core.vector_store import LocalMatch
+import numpy as np
+import threading
+import re
+import os
+
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "15"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.35"))
+CONTEXT_MIN_HITS = int(os.getenv("CONTEXT_MIN_HITS", "1"))
+
+FOLLOW_UP_PREFIXES = ("แล้ว", "และ", "ส่วน", "ต่อ", "อีก")
+FOLLOW_UP_SUFFIXES = ("ล่ะ", "หล่ะ", "ละ", "อ่ะ")
+FOLLOW_UP_MARKERS = (
+    "ดังกล่าว", "ข้างต้น", "เมื่อกี้", "เมื่อสักครู่", "เรื่องนี้", "เรื่องนั้น", "เรื่องเดิม",
+    "ข้อนี้", "ข้อนั้น", "อันนี้", "อันนั้น", "รายการนี้", "รายการนั้น", "รายการแรก", "กรณีนี้", "กรณีนั้น"
+)
+_POLITE_PARTICLES = re.compile(r"(ครับ|คะ|ค่ะ|นะ|จ้า|หน่อย)+$")
+
+def _strip_particles(query: str) -> str:
+    return _POLITE_PARTICLES.sub("", query.strip().rstrip("?？ ")).strip()
+
+def is_follow_up(query: str) -> bool:
+    text = _strip_particles(query)
+    return (
+        text.startswith(FOLLOW_UP_PREFIXES)
+        or text.endswith(FOLLOW_UP_SUFFIXES)
+        or any(marker in text for marker in FOLLOW_UP_MARKERS)
+    )
+
+class ConversationContext:
+    def __init__(self, data_version: Any = None, max_chunks: int = CONTEXT_MAX_CHUNKS):
+        self.data_version = data_version
+        self.max_chunks = max_chunks
+        self.topic_query: Optional[str] = None
+        self._chunks: "OrderedDict[str, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def fingerprint(self) -> Tuple[Optional[str], Tuple[str, ...]]:
+        with self._lock:
+            return self.topic_query, tuple(self._chunks)
+
+    def resolve(self, query: str) -> Tuple[str, bool]:
+        with self._lock:
+            topic, has_chunks = self.topic_query, bool(self._chunks)
+        if not topic or not has_chunks:
+            return query, False
+        if is_follow_up(query):
+            return f"{topic} {_strip_particles(query)}".strip(), True
+        return query, False
+
+    def remember(self, query: str, matches: List[Any], follow_up: bool = False):
+        with self._lock:
+            if not follow_up:
+                self.topic_query = query
+            for match in matches:
+                values = getattr(match, "values", None)
+                if not values:
+                    continue
+                self._chunks.pop(match.id, None)
+                self._chunks[match.id] = (np.asarray(values, dtype=np.float32), dict(match.metadata or {}))
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+
+    def adopt(self, other: "ConversationContext"):
+        with other._lock:
+            topic_query, chunks = other.topic_query, list(other._chunks.items())
+        with self._lock:
+            self.topic_query = topic_query
+            self._chunks = OrderedDict(chunks[-self.max_chunks:])
+
+    def search(self, query_vector: List[float], top_k: int, min_score: float = CONTEXT_MIN_SCORE) -> List[LocalMatch]:
+        with self._lock:
+            if not self._chunks:
+                return []
+            ids = list(self._chunks)
+            vectors = np.stack([self._chunks[chunk_id][0] for chunk_id in ids])
+            metadata = [self._chunks[chunk_id][1] for chunk_id in ids]
+        query = np.asarray(query_vector, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * max(float(np.linalg.norm(query)), 1e-12)
+        scores = (vectors @ query) / np.where(norms > 0, norms, 1.0)
+        order = [i for i in np.argsort(-scores)[:top_k] if scores[i] >= min_score]
+        return [
+            LocalMatch(id=ids[i], score=float(scores[i]), metadata=dict(metadata[i]), values=vectors[i].tolist())
+            for i in order
+        ]
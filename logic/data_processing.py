@@ -1,115 +1,116 @@
 import pandas as pd
 import numpy as np
 import re
-from typing import List
-
-def clean_excel_data(df: pd.DataFrame) -> pd.DataFrame:
-    df_clean = df.copy()
-    
-    df_clean = df_clean.dropna(how='all')
-    df_clean = df_clean.dropna(axis=1, how='all')
-    
-    status_columns = ["รายละเอียด Status", "Status"]
-    
-    for col in df_clean.columns:
-        df_clean[col] = df_clean[col].astype(str)
-        df_clean[col] = df_clean[col].str.strip()
-        
-        if col in status_columns:
-            df_clean[col] = df_clean[col].replace(['nan', 'None', '', ' ', 'NULL'], "ไม่มีข้อมูล")
+import importlib.util
+from typing import List, Optional
+
+SELECTED_COLUMNS = [
+    "ที่มาของ Feedback",
+    "BU",
+    "บคญ./บทญ.",
+    "ประเภท Feedback",
+    "รายละเอียด Feedback",
+    "แนวทางการดำเนินการ",
+    "สถานะการแจ้ง Process Owner ",
+    "Status",
+    "รายละเอียด Status"
+]
+
+STRING_DTYPE = pd.StringDtype("pyarrow" if importlib.util.find_spec("pyarrow") else "python")
+STATUS_COLUMNS = ["รายละเอียด Status", "Status"]
+CATEGORICAL_COLUMNS = ["BU", "Status", "ประเภท Feedback"]
+GROUP_KEY_COLUMNS = ["ที่มาของ Feedback", "BU", "ประเภท Feedback"]
+MISSING_VALUES = ['nan', 'None', '', ' ', 'NULL']
+NO_DATA = "ไม่มีข้อมูล"
+
+def clean_excel_data(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    row_has_data = np.zeros(len(df), dtype=bool)
+    columns_with_data = []
+    for col in df.columns:
+        not_null = df[col].notna().to_numpy()
+        row_has_data |= not_null
+        if not_null.any():
+            columns_with_data.append(col)
+
+    if columns is not None:
+        columns_with_data = [col for col in columns if col in columns_with_data]
+
+    cleaned = {}
+    for col in columns_with_data:
+        values = df[col][row_has_data].astype(STRING_DTYPE).str.strip()
+        missing = values.isna() | values.isin(MISSING_VALUES)
+        if col in STATUS_COLUMNS:
+            values = values.mask(missing, NO_DATA)
         else:
-            df_clean[col] = df_clean[col].replace(['nan', 'None', '', ' ', 'NULL'], np.nan)
-    
-    return df_clean
+            values = values.mask(missing)
+        if col in CATEGORICAL_COLUMNS:
+            values = values.astype("category")
+        cleaned[col] = values
+
+    return pd.DataFrame(cleaned, index=df.index[row_has_data])
 
 def handle_merged_cells(df: pd.DataFrame, key_columns: List[str]) -> pd.DataFrame:
-    df_processed = df.copy()
-    
     for col in key_columns:
-        if col in df_processed.columns and col != "รายละเอียด Status":
-            df_processed[col] = df_processed[col].ffill()
-    
-    return df_processed
+        if col in df.columns and col != "รายละเอียด Status":
+            df[col] = df[col].ffill()
+
+    return df
 
 def is_numbered_feedback(text: str) -> bool:
     if pd.isna(text):
         return False
     return bool(re.match(r"^\d+\.", str(text).strip()))
 
+def _value_changed(series: pd.Series) -> np.ndarray:
+    codes = pd.factorize(series)[0]
+    changed = np.ones(len(codes), dtype=bool)
+    changed[1:] = codes[1:] != codes[:-1]
+    return changed
+
 def group_related_rows(df: pd.DataFrame, selected_columns: List[str]) -> pd.DataFrame:
-    df_grouped = df.copy()
-    
-    group_id = 0
-    prev_main_feedback = None
-    group_ids = []
-
-    for idx, row in df_grouped.iterrows():
-        main_feedback = "|".join([
-            str(row.get("ที่มาของ Feedback", "") or ""),
-            str(row.get("BU", "") or ""),
-            str(row.get("ประเภท Feedback", "") or "")
-        ])
-
-        detail_text = str(row.get("รายละเอียด Feedback", "")).strip()
-        has_numbered_start = is_numbered_feedback(detail_text)
-
-        if idx == 0:
-            group_id = 1
-            prev_main_feedback = main_feedback
-        else:
-            if main_feedback != prev_main_feedback:
-                group_id += 1
-                prev_main_feedback = main_feedback
-            elif not has_numbered_start and detail_text and detail_text != "nan":
-                group_id += 1
-                prev_main_feedback = main_feedback
+    starts_group = np.zeros(len(df), dtype=bool)
+    for col in GROUP_KEY_COLUMNS:
+        if col in df.columns:
+            starts_group |= _value_changed(df[col])
+    if len(starts_group):
+        starts_group[0] = True
 
-        group_ids.append(group_id)
+    if "รายละเอียด Feedback" in df.columns:
+        detail = df["รายละเอียด Feedback"].astype(STRING_DTYPE)
+        numbered = detail.str.match(r"^\d+\.").fillna(False).to_numpy(dtype=bool)
+        starts_group |= detail.notna().to_numpy() & ~numbered
 
-    df_grouped["group_id"] = group_ids
-    return df_grouped
+    df["group_id"] = np.cumsum(starts_group)
+    return df
 
 def consolidate_groups(df_grouped: pd.DataFrame, selected_columns: List[str]) -> pd.DataFrame:
-    consolidated_data = []
-
-    for group_id in df_grouped['group_id'].unique():
-        group_data = df_grouped[df_grouped['group_id'] == group_id]
-        consolidated_row = {}
-
-        for col in selected_columns:
-            if col == "รายละเอียด Status":
-                status_values = group_data[col].dropna().unique()
-                status_values = [str(val).strip() for val in status_values 
-                            if str(val).strip() and str(val) != 'nan']
-                consolidated_row[col] = ' | '.join(status_values) if status_values else "ไม่มีข้อมูล"
-                
-            elif col == "รายละเอียด Feedback":
-                all_lines = group_data[col].dropna().astype(str).str.strip()
-                all_lines = [line for line in all_lines if line and line != 'nan']
-                consolidated_row[col] = "\n".join(all_lines) if all_lines else "ไม่มีข้อมูล"
-                
-            else:
-                non_null_values = group_data[col].dropna()
-                if not non_null_values.empty:
-                    consolidated_row[col] = str(non_null_values.iloc[0]).strip()
-                else:
-                    consolidated_row[col] = "ไม่มีข้อมูล"
-
-        consolidated_data.append(consolidated_row)
-
-    return pd.DataFrame(consolidated_data)
+    group_ids = df_grouped["group_id"]
+    groups = pd.Index(group_ids.unique(), name="group_id")
+    consolidated = {}
+
+    for col in selected_columns:
+        values = df_grouped[col].astype(STRING_DTYPE)
+        if col == "รายละเอียด Status":
+            pairs = pd.DataFrame({"group_id": group_ids, col: values}).dropna().drop_duplicates()
+            merged = pairs.groupby("group_id", sort=False)[col].agg(" | ".join)
+        elif col == "รายละเอียด Feedback":
+            present = values.dropna()
+            merged = present.groupby(group_ids, sort=False).agg("\n".join)
+        else:
+            merged = values.groupby(group_ids, sort=False).first()
+        consolidated[col] = merged.reindex(groups).astype(STRING_DTYPE).fillna(NO_DATA)
+
+    return pd.DataFrame(consolidated).reset_index(drop=True)
 
 def clean_and_process_data(df: pd.DataFrame, selected_columns: List[str]) -> pd.DataFrame:
     try:
-        df_clean = clean_excel_data(df)
+        df_clean = clean_excel_data(df, selected_columns)
 
         missing_columns = [col for col in selected_columns if col not in df_clean.columns]
         if missing_columns:
             raise ValueError(f"Missing required columns: {missing_columns}")
-        
-        df_selected = df_clean[selected_columns].copy()
-        
-        df_merged = handle_merged_cells(df_selected, selected_columns)
+
+        df_merged = handle_merged_cells(df_clean, selected_columns)
         
         df_filtered = df_merged.dropna(how='all')
         
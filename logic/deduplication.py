@@ -0,0 +1,113 @@
+from typing import Dict, Any, List, Optional, Set
+from core.dedup_index import NearDuplicateIndex, open_dedup_index, NUM_PERMUTATIONS
+from core.vector_store import VectorStore
+from logic.chunking import parse_record_text
+import numpy as np
+import unicodedata
+import hashlib
+import logging
+import zlib
+import re
+import os
+
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "0") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+SHINGLE_SIZE = 5
+SOURCES_FIELD = "sources"
+DEDUP_FIELDS = ["BU", "ประเภท Feedback", "รายละเอียด Feedback"]
+DEDUP_EXACT_FIELDS = [
+    "ที่มาของ Feedback", "บคญ./บทญ.", "แนวทางการดำเนินการ",
+    "สถานะการแจ้ง Process Owner", "Status", "รายละเอียด Status"
+]
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_SEPARATORS = re.compile(r"[\s\.,:;!?\"'()\[\]{}<>\-–—/\\|•·*_#]+")
+
+def _normalize(text: str) -> str:
+    return _SEPARATORS.sub("", unicodedata.normalize("NFKC", text).casefold())
+
+def normalize_for_shingles(text: str) -> str:
+    fields = parse_record_text(text)
+    if "รายละเอียด Feedback" in fields:
+        content = " ".join(fields.get(field, "") for field in DEDUP_FIELDS)
+    else:
+        content = " ".join(fields.values()) or text
+    return _normalize(content)
+
+def exact_key(text: str) -> str:
+    fields = parse_record_text(text)
+    values = "\x00".join(_normalize(fields.get(field, "")) for field in DEDUP_EXACT_FIELDS)
+    return hashlib.blake2b(values.encode("utf-8"), digest_size=4).hexdigest()
+
+def shingle(text: str, size: int = SHINGLE_SIZE, key: str = "") -> Set[str]:
+    normalized = normalize_for_shingles(text)
+    if len(normalized) <= size:
+        return {key + normalized} if normalized else set()
+    return {key + normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+def minhash_signature(text: str, key: str = "") -> np.ndarray:
+    shingles = shingle(text, key=key)
+    if not shingles:
+        return np.full(NUM_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _MERSENNE_PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+def collapse_near_duplicates(
+    filename: str,
+    chunk_ids: List[str],
+    payloads: List[Dict[str, Any]],
+    index: NearDuplicateIndex,
+    threshold: float = DEDUP_THRESHOLD,
+    record_texts: Optional[List[str]] = None
+) -> Dict[int, str]:
+    duplicates: Dict[int, str] = {}
+    for position, (chunk_id, payload) in enumerate(zip(chunk_ids, payloads)):
+        record_text = record_texts[payload["record"]] if record_texts is not None else payload["text"]
+        signature = minhash_signature(payload["text"], key=exact_key(record_text))
+        match = index.find_canonical(signature, threshold)
+        if match:
+            duplicates[position] = match[0]
+            index.add_duplicate(chunk_id, filename, match[0], payload, signature)
+        else:
+            index.add_canonical(chunk_id, filename, signature)
+    logging.info(f"Found {len(duplicates)} near-duplicate chunks in {filename}")
+    return duplicates
+
+def release_file(filename: str, vector_store: VectorStore, index: Optional[NearDuplicateIndex] = None) -> int:
+    index = index or open_dedup_index()
+    entries = index.file_entries(filename) if index is not None else []
+    if not entries:
+        return 0
+
+    promoted = 0
+    affected: Set[str] = set()
+    for entry in entries:
+        chunk_id, canonical_id = entry["chunk_id"], entry["canonical_id"]
+        if chunk_id != canonical_id:
+            affected.add(canonical_id)
+            continue
+
+        survivors = index.duplicates_of(chunk_id, exclude_filename=filename)
+        if not survivors:
+            continue
+        successor = survivors[0]
+        vector = vector_store.fetch_vectors([chunk_id]).get(chunk_id)
+        if vector is None:
+            logging.warning(f"Canonical chunk {chunk_id} is missing from the vector store; dropping its duplicates")
+            continue
+        index.promote(chunk_id, successor["chunk_id"])
+        vector_store.insert_vectors([vector], ids=[successor["chunk_id"]], payloads=[successor["payload"]])
+        affected.add(successor["chunk_id"])
+        promoted += 1
+
+    index.remove_file(filename)
+    updates = {canonical_id: {SOURCES_FIELD: index.sources(canonical_id)} for canonical_id in affected}
+    updates = {canonical_id: update for canonical_id, update in updates.items() if update[SOURCES_FIELD]}
+    if updates:
+        vector_store.update_metadata(updates)
+    logging.info(f"Released {filename} from the near-duplicate index, promoted {promoted} canonical chunks")
+    return promoted
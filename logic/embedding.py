@@ -1,10 +1,397 @@
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings, DeterministicFakeEmbedding
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+import contextlib
+import threading
+import unicodedata
+import tempfile
+import logging
+import shutil
+import queue
+import time
+import re
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 EMBEDDING_MODEL_KWARGS = {"device": "cpu"}
+EMBEDDING_DIMENSION = 384
+EMBEDDING_MAX_SEQ_LENGTH = 128
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"
+ONNX_MODEL_DIR = Path("data") / "onnx" / EMBEDDING_MODEL.split("/")[-1]
+
+MICRO_BATCH_ENABLED = os.getenv("EMBEDDING_MICRO_BATCH", "1") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICRO_BATCH_MAX_SIZE", "16"))
+MICRO_BATCH_MAX_LATENCY_MS = float(os.getenv("EMBEDDING_MICRO_BATCH_MAX_LATENCY_MS", "5"))
+
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+ZERO_WIDTH_CHARS = re.compile(r"[\u200b\u200c\u200d\u2060\ufeff]")
+WHITESPACE = re.compile(r"\s+")
+
+@contextlib.contextmanager
+def _build_lock(path: Path):
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    text = ZERO_WIDTH_CHARS.sub("", text)
+    text = WHITESPACE.sub(" ", text).strip()
+    return text.casefold()
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return vector
+
+    def put(self, query: str, vector: List[float]) -> np.ndarray:
+        key = normalize_query(query)
+        array = np.asarray(vector, dtype=np.float32)
+        array.setflags(write=False)
+        with self._lock:
+            self._entries[key] = array
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return array
+
+    def embed_query(self, query: str, embeddings: Embeddings) -> List[float]:
+        vector = self.get(query)
+        if vector is None:
+            vector = self.put(query, embeddings.embed_query(query))
+        return vector.tolist()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def export(self) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            keys = list(self._entries)
+            vectors = [self._entries[key] for key in keys]
+        if not vectors:
+            return keys, np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        return keys, np.stack(vectors)
+
+    def load(self, keys: List[str], vectors: np.ndarray) -> int:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                if key not in self._entries:
+                    array = np.array(vector, dtype=np.float32)
+                    array.setflags(write=False)
+                    self._entries[key] = array
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "bytes": sum(v.nbytes for v in self._entries.values())
+            }
+
+QUERY_EMBEDDING_CACHE = QueryEmbeddingCache()
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        model_dir: Path = ONNX_MODEL_DIR,
+        quantize: bool = ONNX_QUANTIZE,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        num_threads: int = EMBEDDING_NUM_THREADS
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.model_dir = Path(model_dir)
+        self.batch_size = max(1, batch_size)
+
+        model_path = self._ensure_onnx_model(quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _export_onnx_model(self, fp32_path: Path):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        staging = Path(tempfile.mkdtemp(prefix=f".{self.model_dir.name}.", suffix=".tmp", dir=self.model_dir.parent))
+        try:
+            model = ORTModelForFeatureExtraction.from_pretrained(self.model_name, export=True)
+            model.save_pretrained(staging)
+            AutoTokenizer.from_pretrained(self.model_name).save_pretrained(staging)
+            self.model_dir.mkdir(parents=True, exist_ok=True)
+            for path in sorted(staging.iterdir(), key=lambda path: path.name == fp32_path.name):
+                os.replace(path, self.model_dir / path.name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _ensure_onnx_model(self, quantize: bool) -> Path:
+        fp32_path = self.model_dir / "model.onnx"
+        int8_path = self.model_dir / "model_quantized.onnx"
+        model_path = int8_path if quantize else fp32_path
+        if model_path.exists():
+            return model_path
+
+        self.model_dir.parent.mkdir(parents=True, exist_ok=True)
+        with _build_lock(self.model_dir.parent / f".{self.model_dir.name}.lock"):
+            if not fp32_path.exists():
+                self._export_onnx_model(fp32_path)
+            if quantize and not int8_path.exists():
+                from onnxruntime.quantization import quantize_dynamic, QuantType
 
-def get_embedding_model() -> HuggingFaceEmbeddings:
+                staged = int8_path.with_name(f".{int8_path.name}.{os.getpid()}.tmp")
+                try:
+                    quantize_dynamic(str(fp32_path), str(staged), weight_type=QuantType.QInt8)
+                    os.replace(staged, int8_path)
+                finally:
+                    staged.unlink(missing_ok=True)
+        return model_path
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=EMBEDDING_MAX_SEQ_LENGTH,
+            return_tensors="np"
+        )
+        inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        batches = [
+            self._embed_batch(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+class MicroBatchingEmbeddings(Embeddings):
+    def __init__(
+        self,
+        inner: Embeddings,
+        max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+        max_latency_ms: float = MICRO_BATCH_MAX_LATENCY_MS
+    ):
+        self.inner = inner
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max(0.0, max_latency_ms) / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._fill_histogram = [0] * self.max_batch_size
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+            self._worker.start()
+
+    def _collect_batch(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            self._record_batch(len(batch))
+
+    def _record_batch(self, size: int):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch = max(self._max_batch, size)
+            self._fill_histogram[size - 1] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self._batches
+            mean_size = self._items / batches if batches else 0.0
+            return {
+                "batches": batches,
+                "items": self._items,
+                "max_batch_size": self.max_batch_size,
+                "max_latency_ms": self.max_latency * 1000,
+                "largest_batch": self._max_batch,
+                "mean_batch_size": mean_size,
+                "mean_fill_rate": mean_size / self.max_batch_size,
+                "fill_histogram": {size + 1: count for size, count in enumerate(self._fill_histogram) if count}
+            }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+@lru_cache(maxsize=None)
+def get_embedding_model(backend: Optional[str] = None) -> Embeddings:
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        try:
+            return OnnxMiniLMEmbeddings()
+        except ImportError as e:
+            logging.warning(
+                f"EMBEDDING_BACKEND=onnx needs the optional ONNX packages ({e.name} is missing); "
+                f"install them with pip install \"optimum[onnxruntime]\". Falling back to the huggingface backend"
+            )
+            backend = "huggingface"
+    if backend == "fake":
+        return DeterministicFakeEmbedding(size=EMBEDDING_DIMENSION)
+    if backend != "huggingface":
+        raise ValueError(f"Unknown embedding backend: {backend}")
     return HuggingFaceEmbeddings(
         model_name=EMBEDDING_MODEL,
-        model_kwargs=EMBEDDING_MODEL_KWARGS
-    )
\ No newline at end of file
+        model_kwargs=EMBEDDING_MODEL_KWARGS,
+        encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE}
+    )
+
+@lru_cache(maxsize=None)
+def get_query_embedding_model() -> Embeddings:
+    model = get_embedding_model()
+    if not MICRO_BATCH_ENABLED:
+        return model
+    return MicroBatchingEmbeddings(model)
+
+def benchmark_embedding_backends(
+    texts: List[str],
+    backends: List[str] = ("huggingface", "onnx"),
+    repeats: int = 3
+) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    reference = None
+
+    for backend in backends:
+        model = get_embedding_model(backend)
+        model.embed_documents(texts[:EMBEDDING_BATCH_SIZE])
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            vectors = np.asarray(model.embed_documents(texts), dtype=np.float32)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        result = {
+            "dimension": vectors.shape[1],
+            "seconds": best,
+            "texts_per_second": len(texts) / best if best else float("inf")
+        }
+
+        if reference is None:
+            reference = vectors
+        else:
+            a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            b = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            cosine = (a * b).sum(axis=1)
+            result["min_cosine_to_reference"] = float(cosine.min())
+            result["mean_cosine_to_reference"] = float(cosine.mean())
+
+        report[backend] = result
+
+    return report
+
+if __name__ == "__main__":
+    sample = [
+        "ข้อมูล Career Path ของตำแหน่ง ผู้จัดการ พธม. ในระบบ COACH แสดงผลไม่ถูกต้อง",
+        "สอบถามสิทธิประโยชน์ของผู้เข้าร่วม secondment",
+        "หลักการคัดเข้า และคัดออก DM Pool",
+        "สามารถลาพักร้อนครึ่งวันได้หรือไม่"
+    ] * 64
+    for name, stats in benchmark_embedding_backends(sample).items():
+        print(name, stats)
@@ -0,0 +1,173 @@
+from typing import Dict, Any, Iterator, List, Optional
+from pathlib import Path
+from core.vector_store import VectorStore, MATCH_PAGE_SIZE, MAX_RANKED_MATCHES, file_id_prefix
+from logic.chunking import parse_record_text
+from logic.embedding import get_query_embedding_model, QUERY_EMBEDDING_CACHE
+from logic.summarization import SUMMARY_FIELD
+import re
+import os
+
+EXHAUSTIVE_TRIGGER = "ขอข้อมูลทั้งหมด"
+EXHAUSTIVE_MIN_SCORE = float(os.getenv("EXHAUSTIVE_MIN_SCORE", "0.45"))
+EXHAUSTIVE_PAGE_SIZE = int(os.getenv("EXHAUSTIVE_PAGE_SIZE", str(MATCH_PAGE_SIZE)))
+EXHAUSTIVE_MAX_RESULTS = int(os.getenv("EXHAUSTIVE_MAX_RESULTS", str(MAX_RANKED_MATCHES)))
+SUMMARY_FALLBACK_LENGTH = 300
+RECORD_CHUNK_WINDOW = 8
+MIN_FILENAME_STEM_CHARS = 4
+MIN_CHUNK_OVERLAP_CHARS = 10
+
+HEADER = "พบข้อมูลที่เกี่ยวข้องทั้งหมดมีดังนี้:\n\n"
+NOT_FOUND = """ขออภัย ไม่พบข้อมูลที่เกี่ยวข้องกับคำถามดังกล่าวในระบบ
+กรุณาติดต่อฝ่ายที่เกี่ยวข้อง หรือระบุคำถามใหม่โดยให้มีรายละเอียดเพิ่มเติม
+เพื่อให้ระบบสามารถค้นหาข้อมูลได้อย่างถูกต้องและแม่นยำ"""
+
+FIELD_LABELS = [
+    ("ที่มาของ Feedback", "ที่มาของ Feedback"),
+    ("BU", "หน่วยงาน (BU)"),
+    ("บคญ./บทญ.", "ฝ่าย (บคญ./บทญ.)"),
+    ("ประเภท Feedback", "ประเภท Feedback"),
+    ("รายละเอียด Feedback", "รายละเอียด Feedback"),
+    ("แนวทางการดำเนินการ", "แนวทางการดำเนินการ"),
+    ("สถานะการแจ้ง Process Owner", "สถานะการแจ้ง Process Owner"),
+    ("Status", "Status"),
+    ("รายละเอียด Status", "รายละเอียด Status")
+]
+
+_TRIGGER_PATTERN = re.compile(r"ขอ\s*ข้อมูล\s*ทั้งหมด\s*(ที่)?\s*(เกี่ยวกับ|เกี่ยวข้องกับ|ของ)?")
+
+def is_exhaustive_request(query: str) -> bool:
+    return EXHAUSTIVE_TRIGGER in query.replace(" ", "")
+
+def strip_trigger(query: str) -> str:
+    return _TRIGGER_PATTERN.sub(" ", query).strip()
+
+def _fallback_summary(fields: Dict[str, str]) -> str:
+    parts = [fields.get(col, "") for col in ("ประเภท Feedback", "รายละเอียด Feedback", "แนวทางการดำเนินการ", "รายละเอียด Status")]
+    summary = " ".join(" ".join(part.split()) for part in parts if part)
+    if len(summary) > SUMMARY_FALLBACK_LENGTH:
+        summary = summary[:SUMMARY_FALLBACK_LENGTH].rstrip() + "..."
+    return summary or "ไม่พบข้อมูลสำหรับสรุป"
+
+def record_field_lines(fields: Dict[str, str], summary: str = "") -> List[str]:
+    lines = []
+    for column, label in FIELD_LABELS:
+        value = fields.get(column, "")
+        if not value and column == "Status":
+            value = "ไม่พบข้อมูล Status"
+        elif not value and column == "รายละเอียด Status":
+            value = f"ไม่พบข้อมูลรายละเอียด Status กรุณาสอบถามฝ่าย {fields.get('บคญ./บทญ.', '-')}"
+        elif not value:
+            value = "-"
+        lines.append(f"{label}: {value}")
+    lines.append(f"สรุปข้อมูล: {summary or _fallback_summary(fields)}")
+    return lines
+
+def format_listing_item(number: int, fields: Dict[str, str], summary: str = "") -> str:
+    lines = [f"🔹 รายการที่ {number}"] + [f"- {line}" for line in record_field_lines(fields, summary)]
+    return "  \n".join(lines) + "\n\n"
+
+def format_record_answer(fields: Dict[str, str], summary: str = "") -> str:
+    return "\n".join(record_field_lines(fields, summary))
+
+def _record_key(match: Any) -> Any:
+    metadata = match.metadata or {}
+    if "record" in metadata:
+        return metadata.get("filename"), metadata["record"]
+    return match.id
+
+def _chunk_position(match: Any) -> Optional[int]:
+    metadata = match.metadata or {}
+    prefix = file_id_prefix(metadata.get("filename", ""))
+    if "record" not in metadata or not match.id.startswith(prefix) or not match.id[len(prefix):].isdigit():
+        return None
+    return int(match.id[len(prefix):])
+
+def _join_chunks(chunks: List[str]) -> str:
+    text = chunks[0] if chunks else ""
+    for chunk in chunks[1:]:
+        overlap = next((size for size in range(min(len(text), len(chunk)), MIN_CHUNK_OVERLAP_CHARS - 1, -1) if text.endswith(chunk[:size])), 0)
+        text += chunk[overlap:] if overlap else f"\n{chunk}"
+    return text
+
+def record_texts(vector_store: VectorStore, matches: List[Any], window: int = RECORD_CHUNK_WINDOW) -> List[str]:
+    neighbours = {}
+    for match in matches:
+        position = _chunk_position(match)
+        if position is not None:
+            prefix = file_id_prefix(match.metadata["filename"])
+            neighbours[match.id] = [f"{prefix}{i:06d}" for i in range(max(0, position - window), position + window + 1)]
+    fetched = vector_store.fetch_metadata(sorted({chunk_id for ids in neighbours.values() for chunk_id in ids}))
+
+    texts = []
+    for match in matches:
+        metadata = match.metadata or {}
+        siblings = [
+            fetched[chunk_id].get("text", "") if chunk_id != match.id else metadata.get("text", "")
+            for chunk_id in neighbours.get(match.id, [])
+            if chunk_id == match.id or (
+                chunk_id in fetched
+                and fetched[chunk_id].get("filename") == metadata.get("filename")
+                and fetched[chunk_id].get("record") == metadata.get("record")
+            )
+        ]
+        texts.append(_join_chunks(siblings) if siblings else metadata.get("text", ""))
+    return texts
+
+def iter_listing_pages(
+    vector_store: VectorStore,
+    query: str,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    min_score: Optional[float] = EXHAUSTIVE_MIN_SCORE,
+    page_size: int = EXHAUSTIVE_PAGE_SIZE,
+    max_results: int = EXHAUSTIVE_MAX_RESULTS
+) -> Iterator[List[str]]:
+    search_text = strip_trigger(query) or query
+    query_vector = QUERY_EMBEDDING_CACHE.embed_query(search_text, get_query_embedding_model())
+    if metadata_filter:
+        min_score = None
+
+    seen = set()
+    number = 0
+    for page in vector_store.iter_match_pages(query_vector, min_score, metadata_filter, page_size, max_results):
+        fresh = []
+        for match in page.matches:
+            key = _record_key(match)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(match)
+        items = []
+        for match, text in zip(fresh, record_texts(vector_store, fresh)):
+            number += 1
+            items.append(format_listing_item(number, parse_record_text(text), (match.metadata or {}).get(SUMMARY_FIELD, "")))
+        if items:
+            yield items
+
+def stream_listing(
+    vector_store: VectorStore,
+    query: str,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> Iterator[str]:
+    found = False
+    for items in iter_listing_pages(vector_store, query, metadata_filter, **kwargs):
+        if not found:
+            found = True
+            yield HEADER
+        yield "".join(items)
+    if not found:
+        yield NOT_FOUND
+
+def _mentions_filename(query: str, filename: str) -> bool:
+    query = query.casefold()
+    if filename.casefold() in query:
+        return True
+    stem = Path(filename).stem.casefold()
+    if len(stem) < MIN_FILENAME_STEM_CHARS:
+        return False
+    return re.search(rf"(?<![a-z0-9_]){re.escape(stem)}(?![a-z0-9_])", query) is not None
+
+def find_filename_filter(query: str, filenames: List[str]) -> Optional[Dict[str, Any]]:
+    mentioned = [name for name in filenames if _mentions_filename(query, name)]
+    if not mentioned:
+        return None
+    return {"filename": {"$in": mentioned}}
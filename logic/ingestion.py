@@ -0,0 +1,138 @@
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseLanguageModel
+from logic.data_processing import clean_and_process_data, SELECTED_COLUMNS
+from logic.chunking import create_text_chunks, create_record_chunks
+from logic.summarization import summarize_records, INGEST_SUMMARIES, SUMMARY_FIELD
+from logic.deduplication import collapse_near_duplicates, release_file, INGEST_DEDUP, SOURCES_FIELD
+from core.vector_store import VectorStore, make_chunk_ids
+from core.dedup_index import NearDuplicateIndex, get_dedup_index, open_dedup_index
+import hashlib
+
+class MissingColumnsError(ValueError):
+    def __init__(self, filename: str, missing_columns: List[str]):
+        self.filename = filename
+        self.missing_columns = missing_columns
+        super().__init__(f"File '{filename}' is missing required columns: {', '.join(missing_columns)}")
+
+@dataclass
+class PreparedFile:
+    filename: str
+    file_hash: str
+    rows: int
+    chunks: List[str]
+    record_texts: List[str]
+    chunk_records: List[int]
+
+def get_file_hash(file_content: bytes) -> str:
+    return hashlib.md5(file_content).hexdigest()
+
+def prepare_workbook(
+    path: Path,
+    filename: Optional[str] = None,
+    file_hash: Optional[str] = None,
+    selected_columns: List[str] = SELECTED_COLUMNS
+) -> PreparedFile:
+    path = Path(path)
+    filename = filename or path.name
+    if file_hash is None:
+        file_hash = get_file_hash(path.read_bytes())
+
+    df = pd.read_excel(path)
+    missing_columns = [col for col in selected_columns if col not in df.columns]
+    if missing_columns:
+        raise MissingColumnsError(filename, missing_columns)
+
+    processed_data = clean_and_process_data(df, selected_columns)
+    record_texts = create_text_chunks(processed_data, selected_columns)
+    record_chunks = create_record_chunks(record_texts)
+    return PreparedFile(
+        filename=filename,
+        file_hash=file_hash,
+        rows=len(processed_data),
+        chunks=[chunk for _, chunk in record_chunks],
+        record_texts=record_texts,
+        chunk_records=[record_index for record_index, _ in record_chunks]
+    )
+
+def index_prepared_file(
+    prepared: PreparedFile,
+    vector_store: VectorStore,
+    embeddings: Embeddings,
+    summarize: bool = INGEST_SUMMARIES,
+    summary_llm: Optional[BaseLanguageModel] = None,
+    dedup: bool = INGEST_DEDUP,
+    dedup_index: Optional[NearDuplicateIndex] = None
+) -> Dict[str, Any]:
+    chunk_ids = make_chunk_ids(prepared.filename, len(prepared.chunks))
+    payloads = [
+        {
+            "text": chunk,
+            "filename": prepared.filename,
+            "original_id": f"{prepared.filename}_{i}",
+            "record": prepared.chunk_records[i]
+        }
+        for i, chunk in enumerate(prepared.chunks)
+    ]
+    duplicates: Dict[int, str] = {}
+    if dedup:
+        dedup_index = dedup_index or get_dedup_index()
+        release_file(prepared.filename, vector_store, dedup_index)
+        duplicates = collapse_near_duplicates(
+            prepared.filename, chunk_ids, payloads, dedup_index, record_texts=prepared.record_texts
+        )
+    else:
+        release_file(prepared.filename, vector_store, dedup_index or open_dedup_index())
+
+    unique = [i for i in range(len(chunk_ids)) if i not in duplicates]
+    if summarize:
+        records = sorted({prepared.chunk_records[i] for i in unique})
+        summaries = dict(zip(records, summarize_records([prepared.record_texts[r] for r in records], llm=summary_llm)))
+        for i in unique:
+            if summaries.get(prepared.chunk_records[i]):
+                payloads[i][SUMMARY_FIELD] = summaries[prepared.chunk_records[i]]
+
+    canonical_positions = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+    external_updates = {}
+    for canonical_id in set(duplicates.values()):
+        sources = dedup_index.sources(canonical_id)
+        if canonical_id in canonical_positions:
+            payloads[canonical_positions[canonical_id]][SOURCES_FIELD] = sources
+        else:
+            external_updates[canonical_id] = {SOURCES_FIELD: sources}
+
+    vectors = embeddings.embed_documents([prepared.chunks[i] for i in unique])
+    vector_store.insert_vectors(vectors, ids=[chunk_ids[i] for i in unique], payloads=[payloads[i] for i in unique])
+    if duplicates:
+        vector_store.delete_vectors([chunk_ids[i] for i in duplicates])
+    if external_updates:
+        vector_store.update_metadata(external_updates)
+
+    return {
+        "upload_date": datetime.now().isoformat(),
+        "rows": prepared.rows,
+        "chunks": len(prepared.chunks),
+        "duplicates": len(duplicates),
+        "filename": prepared.filename,
+        "file_hash": prepared.file_hash,
+        "chunk_ids": chunk_ids
+    }
+
+def delete_indexed_file(filename: str, vector_store: VectorStore, known_ids: Optional[List[str]] = None) -> int:
+    with vector_store.batch():
+        release_file(filename, vector_store)
+        return vector_store.delete_file(filename, known_ids=known_ids)
+
+def ingest_workbook(
+    path: Path,
+    vector_store: VectorStore,
+    embeddings: Embeddings,
+    filename: Optional[str] = None,
+    file_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    prepared = prepare_workbook(path, filename=filename, file_hash=file_hash)
+    return index_prepared_file(prepared, vector_store, embeddings)
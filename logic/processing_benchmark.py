@@ -0,0 +1,170 @@
+from typing import Dict, Any, List, Callable
+from logic.data_processing import clean_and_process_data, SELECTED_COLUMNS, STRING_DTYPE
+import multiprocessing
+import pandas as pd
+import numpy as np
+import resource
+import argparse
+import hashlib
+import json
+import time
+import re
+
+DEFAULT_ROWS = 20000
+DEFAULT_EXTRA_COLUMNS = 30
+LEGACY_BASELINE_NOTE = (
+    "legacy is a single-function re-implementation of the pre-change pipeline, not the original code. "
+    "It uses .map(str) where the original used .astype(str), which reproduces the pandas 2 output. "
+    "identical_output compares the current pipeline against this re-implementation."
+)
+
+def _legacy_clean_and_process_data(df: pd.DataFrame, selected_columns: List[str]) -> pd.DataFrame:
+    df_clean = df.copy().dropna(how='all').dropna(axis=1, how='all')
+    for col in df_clean.columns:
+        df_clean[col] = df_clean[col].map(str).str.strip()
+        if col in ["รายละเอียด Status", "Status"]:
+            df_clean[col] = df_clean[col].replace(['nan', 'None', '', ' ', 'NULL'], "ไม่มีข้อมูล")
+        else:
+            df_clean[col] = df_clean[col].replace(['nan', 'None', '', ' ', 'NULL'], np.nan)
+
+    df_selected = df_clean[selected_columns].copy()
+    for col in selected_columns:
+        if col != "รายละเอียด Status":
+            df_selected[col] = df_selected[col].ffill()
+    df_filtered = df_selected.dropna(how='all').copy()
+
+    group_id, prev_main_feedback, group_ids = 0, None, []
+    for idx, row in df_filtered.iterrows():
+        main_feedback = "|".join(str(row.get(col, "") or "") for col in ["ที่มาของ Feedback", "BU", "ประเภท Feedback"])
+        detail_text = str(row.get("รายละเอียด Feedback", "")).strip()
+        has_numbered_start = bool(re.match(r"^\d+\.", detail_text))
+        if idx == 0:
+            group_id, prev_main_feedback = 1, main_feedback
+        elif main_feedback != prev_main_feedback or (not has_numbered_start and detail_text and detail_text != "nan"):
+            group_id, prev_main_feedback = group_id + 1, main_feedback
+        group_ids.append(group_id)
+    df_filtered["group_id"] = group_ids
+
+    consolidated_data = []
+    for group_id in df_filtered['group_id'].unique():
+        group_data = df_filtered[df_filtered['group_id'] == group_id]
+        consolidated_row = {}
+        for col in selected_columns:
+            values = [str(val).strip() for val in group_data[col].dropna() if str(val).strip() and str(val) != 'nan']
+            if col == "รายละเอียด Status":
+                values = list(dict.fromkeys(values))
+                consolidated_row[col] = ' | '.join(values) if values else "ไม่มีข้อมูล"
+            elif col == "รายละเอียด Feedback":
+                consolidated_row[col] = "\n".join(values) if values else "ไม่มีข้อมูล"
+            else:
+                consolidated_row[col] = values[0] if values else "ไม่มีข้อมูล"
+        consolidated_data.append(consolidated_row)
+
+    return pd.DataFrame(consolidated_data).drop_duplicates().reset_index(drop=True)
+
+def make_sample_sheet(rows: int = DEFAULT_ROWS, extra_columns: int = DEFAULT_EXTRA_COLUMNS, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    starts = rng.random(rows) < 0.4
+    starts[0] = True
+    numbered = rng.integers(1, 6, rows)
+
+    def merged(values: List[str]) -> np.ndarray:
+        column = np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+        column[~starts] = np.nan
+        return column
+
+    data = {
+        "ที่มาของ Feedback": merged(["HRBG", "Townhall", "Survey", "Email"]),
+        "BU": merged(["CNBO", "HRMG", "UPBO", "GPBO", "TCBO"]),
+        "บคญ./บทญ.": merged(["บคญ.", "บทญ.", "นทญ."]),
+        "ประเภท Feedback": merged(["Career Management", "Internal Mobility", "Compensation", "Training"]),
+        "รายละเอียด Feedback": np.array(
+            [f"{n}. รายละเอียดข้อเสนอแนะลำดับที่ {i} เกี่ยวกับระบบ COACH" if not start
+             else f"รายละเอียดข้อเสนอแนะหลักลำดับที่ {i}" for i, (n, start) in enumerate(zip(numbered, starts))],
+            dtype=object
+        ),
+        "แนวทางการดำเนินการ": merged(["ประสานงานหน่วยงานที่เกี่ยวข้อง", "ชี้แจงผ่าน HR Townhall", "อยู่ระหว่างพิจารณา"]),
+        "สถานะการแจ้ง Process Owner ": merged(["Completed", "In progress", " "]),
+        "Status": merged(["ได้รับการแก้ไขจาก Process Owner แล้ว", "NULL", "อยู่ระหว่างดำเนินการ"]),
+        "รายละเอียด Status": np.where(
+            rng.random(rows) < 0.5, np.nan, np.array(["ดำเนินการแก้ไขเรียบร้อยแล้ว", "รอข้อมูลเพิ่มเติม"], dtype=object)[rng.integers(0, 2, rows)]
+        ).astype(object)
+    }
+    for i in range(extra_columns):
+        if i % 2:
+            data[f"Extra {i}"] = rng.random(rows)
+        else:
+            data[f"Extra {i}"] = np.array([f"หมายเหตุ {j % 997}" for j in range(rows)], dtype=object)
+    df = pd.DataFrame(data)
+    df.iloc[rng.integers(0, rows, rows // 100)] = np.nan
+    return df
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _read_rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+def _run_variant(name: str, rows: int, extra_columns: int, queue):
+    process: Callable[[pd.DataFrame, List[str]], pd.DataFrame] = {
+        "legacy": _legacy_clean_and_process_data,
+        "current": clean_and_process_data
+    }[name]
+    df = make_sample_sheet(rows, extra_columns)
+    if _reset_peak_rss():
+        baseline_kb = _read_rss_kb("VmRSS:")
+    else:
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    result = process(df, SELECTED_COLUMNS)
+    elapsed = time.perf_counter() - started
+
+    peak_kb = _read_rss_kb("VmHWM:") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    digest = hashlib.md5(result.astype(object).to_csv(index=False).encode("utf-8")).hexdigest()
+    queue.put({
+        "variant": name,
+        "rows_in": rows,
+        "rows_out": len(result),
+        "seconds": round(elapsed, 3),
+        "peak_rss_increase_mb": round((peak_kb - baseline_kb) / 1024, 1),
+        "output_md5": digest
+    })
+
+def profile_processing_memory(rows: int = DEFAULT_ROWS, extra_columns: int = DEFAULT_EXTRA_COLUMNS) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in ["legacy", "current"]:
+        queue = context.Queue()
+        worker = context.Process(target=_run_variant, args=(name, rows, extra_columns, queue))
+        worker.start()
+        results[name] = queue.get()
+        worker.join()
+
+    legacy, current = results["legacy"], results["current"]
+    return {
+        "pandas_version": pd.__version__,
+        "string_storage": STRING_DTYPE.storage,
+        "baseline": LEGACY_BASELINE_NOTE,
+        "legacy": legacy,
+        "current": current,
+        "identical_output": legacy["output_md5"] == current["output_md5"],
+        "peak_rss_reduction": round(1 - current["peak_rss_increase_mb"] / legacy["peak_rss_increase_mb"], 3)
+        if legacy["peak_rss_increase_mb"] else 0.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare peak memory of the spreadsheet processing pipeline")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--extra-columns", type=int, default=DEFAULT_EXTRA_COLUMNS)
+    args = parser.parse_args()
+    print(json.dumps(profile_processing_memory(args.rows, args.extra_columns), indent=2, ensure_ascii=False))
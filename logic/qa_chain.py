@@ -1,17 +1,29 @@
-from langchain.prompts import PromptTemplate
+from langchain.prompts import ChatPromptTemplate
 from langchain.chains import RetrievalQA
 from langchain.schema import BaseRetriever, Document
 from langchain_openai import ChatOpenAI
-from core.vector_store import PineconeVectorStore
-from typing import Optional, List
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from core.vector_store import VectorStore
+from typing import Optional, List, Dict, Any, Iterator
 from pydantic import BaseModel
-from logic.embedding import get_embedding_model
+import logging
+import os
+from logic.embedding import get_query_embedding_model, QUERY_EMBEDDING_CACHE
+from logic.reranking import get_reranker, RERANKER_FETCH_K
+from logic.usage_tracking import PROMPT_CACHE_TRACKER
+from logic.summarization import SUMMARY_FIELD
+from logic.deduplication import SOURCES_FIELD
+from logic.exhaustive import is_exhaustive_request, stream_listing, find_filename_filter
+from logic.conversation import ConversationContext, CONTEXT_MIN_HITS
 
 DEFAULT_MODEL_NAME = "gpt-4.1-mini"
 DEFAULT_TEMPERATURE = 0.3
 DEFAULT_TOP_K = 5
+QA_LLM_BACKEND = os.getenv("QA_LLM_BACKEND", "openai")
+FAKE_LLM_RESPONSE = "ขออภัย ไม่พบข้อมูลที่เกี่ยวข้องกับคำถามดังกล่าวในระบบ"
 
-TEMPLATE = """คุณคือผู้ช่วยฝ่ายทรัพยากรบุคคลของบริษัท PTT ที่มีหน้าที่ในการให้ข้อมูลแก่ผู้ใช้งานอย่างถูกต้อง แม่นยำ และเป็นทางการ  
+SYSTEM_PROMPT = """คุณคือผู้ช่วยฝ่ายทรัพยากรบุคคลของบริษัท PTT ที่มีหน้าที่ในการให้ข้อมูลแก่ผู้ใช้งานอย่างถูกต้อง แม่นยำ และเป็นทางการ  
 โดยต้องอ้างอิงเฉพาะจาก "ข้อมูลที่เกี่ยวข้อง" เท่านั้น **ห้ามเดา ห้ามสร้างข้อมูลขึ้นเอง และห้ามใช้ความรู้ภายนอก**
 
 ---
@@ -105,6 +117,7 @@ TEMPLATE = """คุณคือผู้ช่วยฝ่ายทรัพย
     - หากไม่พบข้อมูลเฉพาะบางช่อง เช่น "รายละเอียด Status" ให้ใช้ข้อความที่กำหนด
 3. ❌ ห้ามใส่คำอธิบาย คำแนะนำ หรือความคิดเห็นเพิ่มเติม
 4. ✅ ต้องตอบกลับตามรูปแบบที่สอดคล้องกับข้อมูลที่พบ (A / B / C / D)
+5. ✅ หากรายการใดใน "ข้อมูลที่เกี่ยวข้อง" มีช่อง "สรุปข้อมูล" อยู่แล้ว ให้ใช้ข้อความนั้นเป็น "สรุปข้อมูล" ของรายการนั้นทันที โดยไม่ต้องสรุปใหม่
 
 ---
 
@@ -139,8 +152,9 @@ Status: ไม่พบข้อมูล Status
 สรุปข้อมูล: สิทธิประโยชน์ของพนักงานที่เข้าร่วมโครงการ secondment คือได้รับเงินเดือนจากต้นสังกัดเดิมเท่านั้น ไม่มีการจ่ายซ้ำซ้อน ข้อมูลนี้ได้รับการชี้แจงผ่าน HR Townhall และคู่มือ Internal Mobility แล้ว
 
 ---
+"""
 
-🧠 ข้อมูลที่เกี่ยวข้อง:  
+HUMAN_TEMPLATE = """🧠 ข้อมูลที่เกี่ยวข้อง:  
 {context}
 
 📩 คำถามจากผู้ใช้งาน:  
@@ -150,45 +164,88 @@ Status: ไม่พบข้อมูล Status
 """
 
 class CustomRetriever(BaseRetriever, BaseModel):
-    vector_store: PineconeVectorStore
+    vector_store: VectorStore
+    top_k: int = DEFAULT_TOP_K
+    fetch_k: int = RERANKER_FETCH_K
+    reranker: Optional[Any] = None
 
     class Config:
         arbitrary_types_allowed = True
 
-    def get_relevant_documents(self, query: str) -> List[Document]:
-        query_embedding = get_embedding_model().embed_query(query)
-        results = self.vector_store.search_vectors(
-            query_vector=query_embedding,
-            top_k=DEFAULT_TOP_K
-        )
+    def _to_documents(self, results: List[Any]) -> List[Document]:
         documents = []
         for result in results:
             metadata = result.metadata or {}
+            page_content = metadata.get('text', '')
+            summary = metadata.get(SUMMARY_FIELD, '')
+            if summary:
+                page_content = f"{page_content}\nสรุปข้อมูล: {summary}"
             doc = Document(
-                page_content=metadata.get('text', ''),
+                page_content=page_content,
                 metadata={
+                    'id': getattr(result, 'id', None),
                     'score': getattr(result, 'score', None),
-                    'source': metadata.get('source', '')
+                    'source': metadata.get('source', ''),
+                    'original_id': metadata.get('original_id', ''),
+                    SUMMARY_FIELD: summary,
+                    SOURCES_FIELD: list(metadata.get(SOURCES_FIELD) or [])
                 }
             )
             documents.append(doc)
         return documents
 
+    def retrieve(self, query: str, context: Optional[ConversationContext] = None, follow_up: bool = False) -> List[Document]:
+        query_embedding = QUERY_EMBEDDING_CACHE.embed_query(query, get_query_embedding_model())
+        top_k = max(self.fetch_k, self.top_k) if self.reranker else self.top_k
+        results = context.search(query_embedding, top_k) if context is not None and follow_up else []
+        if len(results) >= CONTEXT_MIN_HITS:
+            logging.info(f"Served follow-up query from {len(results)} cached conversation chunks")
+        else:
+            results = self.vector_store.search_vectors(
+                query_vector=query_embedding,
+                top_k=top_k,
+                include_values=context is not None
+            )
+            if context is not None:
+                context.remember(query, results, follow_up)
+        documents = self._to_documents(results)
+        if self.reranker:
+            return self.reranker.rerank(query, documents, self.top_k)
+        return documents
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        return self.retrieve(query)
+
     async def aget_relevant_documents(self, query: str) -> List[Document]:
         return await super().aget_relevant_documents(query)
 
-def get_qa_chain(vectordb: PineconeVectorStore, model_name: str = DEFAULT_MODEL_NAME) -> Optional[RetrievalQA]:
-    if not vectordb:
-        raise ValueError("Vector database is empty or not initialized")
-    prompt = PromptTemplate(
-        template=TEMPLATE,
-        input_variables=["context", "question"]
-    )
-    llm = ChatOpenAI(
+def get_llm(model_name: str = DEFAULT_MODEL_NAME, timeout: Optional[float] = None) -> BaseChatModel:
+    if QA_LLM_BACKEND == "fake":
+        return FakeListChatModel(responses=[FAKE_LLM_RESPONSE])
+    return ChatOpenAI(
         model=model_name,
-        temperature=DEFAULT_TEMPERATURE
+        temperature=DEFAULT_TEMPERATURE,
+        timeout=timeout,
+        stream_usage=True,
+        callbacks=[PROMPT_CACHE_TRACKER]
     )
-    retriever = CustomRetriever(vector_store=vectordb)
+
+def get_qa_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        ("human", HUMAN_TEMPLATE)
+    ])
+
+def get_qa_chain(
+    vectordb: VectorStore,
+    model_name: str = DEFAULT_MODEL_NAME,
+    llm: Optional[BaseChatModel] = None
+) -> Optional[RetrievalQA]:
+    if not vectordb:
+        raise ValueError("Vector database is empty or not initialized")
+    prompt = get_qa_prompt()
+    llm = llm or get_llm(model_name)
+    retriever = CustomRetriever(vector_store=vectordb, reranker=get_reranker())
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
@@ -196,4 +253,40 @@ def get_qa_chain(vectordb: PineconeVectorStore, model_name: str = DEFAULT_MODEL_
         chain_type_kwargs={"prompt": prompt},
         return_source_documents=True
     )
-    return qa_chain
\ No newline at end of file
+    return qa_chain
+
+def answer_query(qa_chain: RetrievalQA, query: str, retrieval_context: Optional[ConversationContext] = None) -> Dict[str, Any]:
+    from logic.routing import QueryRouter
+    if isinstance(qa_chain, QueryRouter):
+        return qa_chain.invoke({"query": query, "retrieval_context": retrieval_context})
+    if retrieval_context is None:
+        return qa_chain.invoke({"query": query})
+
+    resolved, follow_up = retrieval_context.resolve(query)
+    documents = qa_chain.retriever.retrieve(resolved, retrieval_context, follow_up)
+    combine_chain = qa_chain.combine_documents_chain
+    answer = combine_chain.invoke({"input_documents": documents, "question": resolved})[combine_chain.output_key]
+    return {"query": query, "result": answer, "source_documents": documents}
+
+def stream_answer(qa_chain: RetrievalQA, query: str, retrieval_context: Optional[ConversationContext] = None) -> Iterator[str]:
+    if is_exhaustive_request(query):
+        from core.manifest_store import get_manifest_store
+
+        filenames = list(get_manifest_store().summaries().keys())
+        yield from stream_listing(qa_chain.retriever.vector_store, query, find_filename_filter(query, filenames))
+        return
+
+    from logic.routing import QueryRouter
+    if isinstance(qa_chain, QueryRouter):
+        yield from qa_chain.stream(query, retrieval_context)
+        return
+
+    follow_up = False
+    if retrieval_context is not None:
+        query, follow_up = retrieval_context.resolve(query)
+    documents = qa_chain.retriever.retrieve(query, retrieval_context, follow_up)
+    combine_chain = qa_chain.combine_documents_chain
+    context = combine_chain.document_separator.join(doc.page_content for doc in documents)
+    prompt_value = combine_chain.llm_chain.prompt.format_prompt(context=context, question=query)
+    for chunk in combine_chain.llm_chain.llm.stream(prompt_value):
+        yield getattr(chunk, "content", chunk)
@@ -0,0 +1,190 @@
+from langchain.schema import Document
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import threading
+import json
+import time
+import os
+
+RERANKER_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+RERANKER_ENABLED = os.getenv("RERANKER_ENABLED", "0") == "1"
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "16"))
+RERANKER_BUDGET_MS = float(os.getenv("RERANKER_BUDGET_MS", "300"))
+RERANKER_FETCH_K = int(os.getenv("RERANKER_FETCH_K", "20"))
+RERANKER_PROBE_INTERVAL = float(os.getenv("RERANKER_PROBE_INTERVAL", "30"))
+LATENCY_SMOOTHING = 0.3
+
+class CrossEncoderReranker:
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        batch_size: int = RERANKER_BATCH_SIZE,
+        budget_ms: float = RERANKER_BUDGET_MS,
+        model: Optional[Any] = None,
+        probe_interval: float = RERANKER_PROBE_INTERVAL
+    ):
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name, device="cpu", max_length=256)
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.budget = budget_ms / 1000
+        self.probe_interval = probe_interval
+        self._pair_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._fallbacks = 0
+        self._probes = 0
+        self._total_seconds = 0.0
+        self._last_probe = time.monotonic()
+        self._probing = False
+        self.model.predict([("warm-up", "warm-up")])
+
+    def _estimate(self, pairs: int) -> float:
+        with self._lock:
+            return (self._pair_seconds or 0.0) * pairs
+
+    def _observe(self, pairs: int, seconds: float, replace: bool = False):
+        per_pair = seconds / max(1, pairs)
+        with self._lock:
+            if self._pair_seconds is None or replace:
+                self._pair_seconds = per_pair
+            else:
+                self._pair_seconds += LATENCY_SMOOTHING * (per_pair - self._pair_seconds)
+
+    def _record(self, seconds: float, fallback: bool):
+        with self._lock:
+            self._calls += 1
+            self._total_seconds += seconds
+            if fallback:
+                self._fallbacks += 1
+
+    def _probe(self, pairs: List[Any]):
+        try:
+            started = time.perf_counter()
+            self.model.predict(pairs)
+            self._observe(len(pairs), time.perf_counter() - started, replace=True)
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def _maybe_probe(self, query: str, documents: List[Document]):
+        now = time.monotonic()
+        with self._lock:
+            if self._probing or now - self._last_probe < self.probe_interval:
+                return
+            self._probing = True
+            self._last_probe = now
+            self._probes += 1
+        pairs = [(query, doc.page_content) for doc in documents[:self.batch_size]]
+        threading.Thread(target=self._probe, args=(pairs,), name="reranker-probe", daemon=True).start()
+
+    def rerank(self, query: str, documents: List[Document], top_k: int) -> List[Document]:
+        start = time.perf_counter()
+        if len(documents) <= 1 or self._estimate(len(documents)) > self.budget:
+            self._record(time.perf_counter() - start, fallback=len(documents) > 1)
+            if len(documents) > 1:
+                self._maybe_probe(query, documents)
+            return documents[:top_k]
+
+        scores: List[float] = []
+        for offset in range(0, len(documents), self.batch_size):
+            batch = documents[offset:offset + self.batch_size]
+            elapsed = time.perf_counter() - start
+            if scores and elapsed + self._estimate(len(batch)) > self.budget:
+                self._record(time.perf_counter() - start, fallback=True)
+                self._maybe_probe(query, documents)
+                return documents[:top_k]
+
+            batch_start = time.perf_counter()
+            batch_scores = self.model.predict([(query, doc.page_content) for doc in batch])
+            self._observe(len(batch), time.perf_counter() - batch_start)
+            scores.extend(float(score) for score in batch_scores)
+
+        ranked = sorted(zip(scores, range(len(documents))), key=lambda item: item[0], reverse=True)
+        reranked = []
+        for score, position in ranked[:top_k]:
+            doc = documents[position]
+            doc.metadata["rerank_score"] = score
+            doc.metadata["vector_rank"] = position
+            reranked.append(doc)
+
+        self._record(time.perf_counter() - start, fallback=False)
+        return reranked
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "fallbacks": self._fallbacks,
+                "fallback_rate": self._fallbacks / self._calls if self._calls else 0.0,
+                "probes": self._probes,
+                "mean_ms": self._total_seconds / self._calls * 1000 if self._calls else 0.0,
+                "estimated_pair_ms": (self._pair_seconds or 0.0) * 1000,
+                "budget_ms": self.budget * 1000
+            }
+
+@lru_cache(maxsize=None)
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    if not RERANKER_ENABLED:
+        return None
+    return CrossEncoderReranker()
+
+def load_labelled_queries(path: Path) -> List[Dict[str, Any]]:
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                queries.append({"query": item["query"], "relevant_ids": set(item["relevant_ids"])})
+    return queries
+
+def _score_ranking(documents: List[Document], relevant_ids: set, k: int) -> Dict[str, float]:
+    ids = [doc.metadata.get("original_id") for doc in documents[:k]]
+    hits = [i for i, doc_id in enumerate(ids) if doc_id in relevant_ids]
+    return {
+        "hit": 1.0 if hits else 0.0,
+        "mrr": 1.0 / (hits[0] + 1) if hits else 0.0,
+        "recall": len(hits) / len(relevant_ids) if relevant_ids else 0.0
+    }
+
+def evaluate_reranker(
+    vector_store,
+    labelled_queries: List[Dict[str, Any]],
+    reranker: CrossEncoderReranker,
+    k: int = 5,
+    fetch_k: int = RERANKER_FETCH_K
+) -> Dict[str, Dict[str, float]]:
+    from logic.qa_chain import CustomRetriever
+
+    retrievers = {
+        "vector": CustomRetriever(vector_store=vector_store, top_k=k),
+        "reranked": CustomRetriever(vector_store=vector_store, top_k=k, fetch_k=fetch_k, reranker=reranker)
+    }
+    report = {}
+
+    for name, retriever in retrievers.items():
+        totals = {"hit": 0.0, "mrr": 0.0, "recall": 0.0, "latency_ms": 0.0}
+        for item in labelled_queries:
+            start = time.perf_counter()
+            documents = retriever.get_relevant_documents(item["query"])
+            totals["latency_ms"] += (time.perf_counter() - start) * 1000
+            for metric, value in _score_ranking(documents, item["relevant_ids"], k).items():
+                totals[metric] += value
+
+        count = max(1, len(labelled_queries))
+        report[name] = {metric: value / count for metric, value in totals.items()}
+
+    report["reranker"] = reranker.get_stats()
+    return report
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    from core.vector_store import get_vector_store
+
+    load_dotenv()
+    labelled = load_labelled_queries(Path(sys.argv[1]))
+    for name, metrics in evaluate_reranker(get_vector_store(), labelled, CrossEncoderReranker()).items():
+        print(name, metrics)
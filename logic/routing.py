@@ -0,0 +1,249 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from langchain.schema import Document
+from langchain_core.language_models import BaseChatModel
+from core.vector_store import VectorStore
+from logic.qa_chain import CustomRetriever, get_llm, get_qa_prompt, DEFAULT_MODEL_NAME
+from logic.reranking import get_reranker
+from logic.exhaustive import format_record_answer, NOT_FOUND
+from logic.chunking import parse_record_text
+from logic.summarization import SUMMARY_FIELD
+from logic.usage_tracking import extract_message_usage
+from logic.conversation import ConversationContext
+import threading
+import logging
+import time
+import os
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "0") == "1"
+ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "gpt-4.1-nano")
+ROUTER_STANDARD_MODEL = os.getenv("ROUTER_STANDARD_MODEL", DEFAULT_MODEL_NAME)
+ROUTER_FAST_TIMEOUT = float(os.getenv("ROUTER_FAST_TIMEOUT", "20"))
+ROUTER_STANDARD_TIMEOUT = float(os.getenv("ROUTER_STANDARD_TIMEOUT", "60"))
+ROUTER_NO_MATCH_SCORE = float(os.getenv("ROUTER_NO_MATCH_SCORE", "0.30"))
+ROUTER_FAST_SCORE = float(os.getenv("ROUTER_FAST_SCORE", "0.60"))
+ROUTER_TEMPLATE_SCORE = float(os.getenv("ROUTER_TEMPLATE_SCORE", "0.80"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+ROUTER_FAST_MAX_CHARS = int(os.getenv("ROUTER_FAST_MAX_CHARS", "80"))
+MAX_RECENT_ROUTES = 200
+
+SYNTHESIS_MARKERS = ["เปรียบเทียบ", "แนวโน้ม", "ภาพรวม", "ทั้งหมด", "กี่", "จำนวน", "สรุป", "วิเคราะห์", "ต่างกัน", "เหมือนกัน"]
+
+MODEL_PRICES = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00)
+}
+
+@dataclass
+class ModelTier:
+    name: str
+    model: Optional[str]
+    timeout: float
+    fallback: Optional[str] = None
+
+@dataclass
+class RouteDecision:
+    tier: str
+    reason: str
+    top_score: float
+    margin: float
+    query_chars: int
+
+DEFAULT_TIERS = {
+    "template": ModelTier("template", None, 1.0),
+    "fast": ModelTier("fast", ROUTER_FAST_MODEL, ROUTER_FAST_TIMEOUT, fallback="standard"),
+    "standard": ModelTier("standard", ROUTER_STANDARD_MODEL, ROUTER_STANDARD_TIMEOUT, fallback="template")
+}
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="router")
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    if model not in MODEL_PRICES:
+        return 0.0
+    input_price, cached_price, output_price = MODEL_PRICES[model]
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+class RouteStatsTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, float]] = {}
+        self._recent: List[Dict[str, Any]] = []
+
+    def record(
+        self,
+        tier: ModelTier,
+        decision: RouteDecision,
+        latency_ms: float,
+        usage: Tuple[int, int, int] = (0, 0, 0),
+        error: Optional[BaseException] = None,
+        fallback: bool = False
+    ):
+        cost = estimate_cost(tier.model, *usage)
+        with self._lock:
+            stats = self._tiers.setdefault(tier.name, {
+                "calls": 0, "errors": 0, "fallback_calls": 0, "latency_ms": 0.0,
+                "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0
+            })
+            stats["calls"] += 1
+            stats["errors"] += int(error is not None)
+            stats["fallback_calls"] += int(fallback)
+            stats["latency_ms"] += latency_ms
+            stats["prompt_tokens"] += usage[0]
+            stats["cached_prompt_tokens"] += usage[1]
+            stats["completion_tokens"] += usage[2]
+            stats["cost_usd"] += cost
+            self._recent.append({
+                **asdict(decision),
+                "served_by": tier.name,
+                "model": tier.model,
+                "latency_ms": round(latency_ms, 2),
+                "cost_usd": round(cost, 6),
+                "error": type(error).__name__ if error else None
+            })
+            del self._recent[:-MAX_RECENT_ROUTES]
+
+    def get_stats(self, recent: Optional[int] = 20) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {name: dict(stats) for name, stats in self._tiers.items()}
+            recent_routes = list(self._recent[-recent:]) if recent else []
+        for stats in tiers.values():
+            stats["mean_latency_ms"] = stats["latency_ms"] / stats["calls"] if stats["calls"] else 0.0
+            stats["mean_cost_usd"] = stats["cost_usd"] / stats["calls"] if stats["calls"] else 0.0
+        return {"tiers": tiers, "recent": recent_routes}
+
+ROUTE_STATS = RouteStatsTracker()
+
+def classify_query(query: str, documents: List[Document]) -> RouteDecision:
+    scores = sorted((doc.metadata.get("score") or 0.0 for doc in documents), reverse=True)
+    top_score = scores[0] if scores else 0.0
+    margin = top_score - (scores[1] if len(scores) > 1 else 0.0)
+
+    def decide(tier: str, reason: str) -> RouteDecision:
+        return RouteDecision(tier, reason, round(top_score, 4), round(margin, 4), len(query))
+
+    if not documents or top_score < ROUTER_NO_MATCH_SCORE:
+        return decide("template", "no_match")
+    if len(query) > ROUTER_FAST_MAX_CHARS or any(marker in query for marker in SYNTHESIS_MARKERS):
+        return decide("standard", "synthesis")
+    if top_score >= ROUTER_TEMPLATE_SCORE and margin >= ROUTER_MIN_MARGIN and documents[0].metadata.get(SUMMARY_FIELD):
+        return decide("template", "exact_lookup")
+    if top_score >= ROUTER_FAST_SCORE and margin >= ROUTER_MIN_MARGIN:
+        return decide("fast", "single_record")
+    return decide("standard", "ambiguous")
+
+def render_template_answer(decision: RouteDecision, documents: List[Document]) -> str:
+    if decision.reason == "no_match" or not documents:
+        return NOT_FOUND
+    document = documents[0]
+    summary = document.metadata.get(SUMMARY_FIELD, "")
+    text = document.page_content
+    if summary and text.endswith(f"\nสรุปข้อมูล: {summary}"):
+        text = text[:-len(f"\nสรุปข้อมูล: {summary}")]
+    return format_record_answer(parse_record_text(text), summary)
+
+class QueryRouter:
+    def __init__(
+        self,
+        retriever: CustomRetriever,
+        tiers: Optional[Dict[str, ModelTier]] = None,
+        llms: Optional[Dict[str, BaseChatModel]] = None,
+        tracker: RouteStatsTracker = ROUTE_STATS
+    ):
+        self.retriever = retriever
+        self.tiers = tiers or DEFAULT_TIERS
+        self.prompt = get_qa_prompt()
+        self.tracker = tracker
+        self._llms = dict(llms or {})
+        self._lock = threading.Lock()
+
+    def _llm(self, tier: ModelTier) -> BaseChatModel:
+        with self._lock:
+            if tier.name not in self._llms:
+                self._llms[tier.name] = get_llm(tier.model, timeout=tier.timeout)
+            return self._llms[tier.name]
+
+    def _prompt_value(self, query: str, documents: List[Document]):
+        context = "\n\n".join(doc.page_content for doc in documents)
+        return self.prompt.format_prompt(context=context, question=query)
+
+    def route(self, query: str, retrieval_context: Optional[ConversationContext] = None) -> Tuple[str, List[Document], RouteDecision]:
+        follow_up = False
+        if retrieval_context is not None:
+            query, follow_up = retrieval_context.resolve(query)
+        documents = self.retriever.retrieve(query, retrieval_context, follow_up)
+        decision = classify_query(query, documents)
+        logging.info(f"Routed query to {decision.tier} ({decision.reason}, top_score={decision.top_score})")
+        return query, documents, decision
+
+    def _fallback_chain(self, tier_name: str) -> Iterator[ModelTier]:
+        seen = set()
+        while tier_name and tier_name not in seen:
+            seen.add(tier_name)
+            tier = self.tiers[tier_name]
+            yield tier
+            tier_name = tier.fallback
+
+    def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        query, documents, decision = self.route(inputs["query"], inputs.get("retrieval_context"))
+        last_error: Optional[BaseException] = None
+
+        for attempt, tier in enumerate(self._fallback_chain(decision.tier)):
+            started = time.perf_counter()
+            try:
+                if tier.model is None:
+                    result, usage = render_template_answer(decision, documents), (0, 0, 0)
+                else:
+                    future = _executor.submit(self._llm(tier).invoke, self._prompt_value(query, documents))
+                    message = future.result(timeout=tier.timeout)
+                    result, usage = message.content, extract_message_usage(message)
+            except Exception as e:
+                logging.warning(f"Tier {tier.name} failed for routed query: {e!r}")
+                self.tracker.record(tier, decision, (time.perf_counter() - started) * 1000, error=e, fallback=attempt > 0)
+                last_error = e
+                continue
+            self.tracker.record(tier, decision, (time.perf_counter() - started) * 1000, usage, fallback=attempt > 0)
+            return {
+                "query": query,
+                "result": result,
+                "source_documents": documents,
+                "route": {**asdict(decision), "served_by": tier.name}
+            }
+        raise RuntimeError(f"All model tiers failed for the query: {last_error}")
+
+    def stream(self, query: str, retrieval_context: Optional[ConversationContext] = None) -> Iterator[str]:
+        query, documents, decision = self.route(query, retrieval_context)
+        last_error: Optional[BaseException] = None
+
+        for attempt, tier in enumerate(self._fallback_chain(decision.tier)):
+            started = time.perf_counter()
+            emitted = False
+            usage = None
+            try:
+                if tier.model is None:
+                    emitted = True
+                    yield render_template_answer(decision, documents)
+                else:
+                    for chunk in self._llm(tier).stream(self._prompt_value(query, documents)):
+                        usage = chunk if usage is None else usage + chunk
+                        emitted = True
+                        yield getattr(chunk, "content", chunk)
+            except Exception as e:
+                logging.warning(f"Tier {tier.name} failed while streaming a routed query: {e!r}")
+                self.tracker.record(tier, decision, (time.perf_counter() - started) * 1000, error=e, fallback=attempt > 0)
+                if emitted:
+                    raise
+                last_error = e
+                continue
+            self.tracker.record(
+                tier, decision, (time.perf_counter() - started) * 1000,
+                extract_message_usage(usage), fallback=attempt > 0
+            )
+            return
+        raise RuntimeError(f"All model tiers failed for the query: {last_error}")
+
+def get_routed_qa_chain(vectordb: VectorStore, llms: Optional[Dict[str, BaseChatModel]] = None) -> QueryRouter:
+    if not vectordb:
+        raise ValueError("Vector database is empty or not initialized")
+    return QueryRouter(CustomRetriever(vector_store=vectordb, reranker=get_reranker()), llms=llms)
@@ -0,0 +1,229 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from core.vector_store import VectorStore, LocalVectorStore, VECTOR_SIZE, LOCAL_INDEX_DIR, DEFAULT_INDEX_NAME, VECTOR_STORE_BACKEND
+from core.manifest_store import get_manifest_store, MANIFEST_DB_PATH
+from core.dedup_index import get_dedup_index, DEDUP_INDEX_PATH
+import numpy as np
+import argparse
+import logging
+import tempfile
+import shutil
+import json
+import time
+import os
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", str(Path("data") / "snapshots")))
+SNAPSHOT_RESTORE_ON_BOOT = os.getenv("SNAPSHOT_RESTORE_ON_BOOT", "1") == "1"
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+SNAPSHOT_FORMAT_VERSION = 1
+LATEST_POINTER = "LATEST"
+METADATA_FILE = "snapshot.json"
+INDEX_SUBDIR = "local_index"
+MODELS_SUBDIR = "onnx"
+MANIFEST_FILE = "manifest.db"
+DEDUP_FILE = "dedup_index.db"
+CACHE_KEYS_FILE = "query_embeddings.json"
+CACHE_VECTORS_FILE = "query_embeddings.npy"
+
+class SnapshotError(Exception):
+    pass
+
+def _link_or_copy(source: Path, target: Path):
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def _restore_dir(source: Path, target: Path) -> bool:
+    if target.exists():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent))
+    try:
+        shutil.copytree(source, staging, copy_function=_link_or_copy, dirs_exist_ok=True)
+        os.rename(staging, target)
+    except OSError:
+        if not target.exists():
+            raise
+        return False
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return True
+
+def _write_latest(snapshot_dir: Path, name: str):
+    tmp_pointer = snapshot_dir / f"{LATEST_POINTER}.tmp"
+    tmp_pointer.write_text(name, encoding="utf-8")
+    os.replace(tmp_pointer, snapshot_dir / LATEST_POINTER)
+
+def list_snapshots(snapshot_dir: Path = SNAPSHOT_DIR) -> List[Dict[str, Any]]:
+    snapshots = []
+    for path in sorted(Path(snapshot_dir).glob("v*")):
+        metadata_path = path / METADATA_FILE
+        if path.is_dir() and metadata_path.exists():
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                snapshots.append({**json.load(f), "path": str(path)})
+    return snapshots
+
+def latest_snapshot(snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[Path]:
+    pointer = Path(snapshot_dir) / LATEST_POINTER
+    if pointer.exists():
+        path = Path(snapshot_dir) / pointer.read_text(encoding="utf-8").strip()
+        if (path / METADATA_FILE).exists():
+            return path
+    snapshots = list_snapshots(snapshot_dir)
+    return Path(snapshots[-1]["path"]) if snapshots else None
+
+def _prune(snapshot_dir: Path, keep: int):
+    for snapshot in list_snapshots(snapshot_dir)[:-keep] if keep > 0 else []:
+        shutil.rmtree(snapshot["path"], ignore_errors=True)
+
+def read_snapshot(path: Path) -> Dict[str, Any]:
+    path = Path(path)
+    with open(path / METADATA_FILE, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    if metadata.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot {path.name} has format {metadata.get('format_version')}, expected {SNAPSHOT_FORMAT_VERSION}")
+    if metadata.get("vector_size") != VECTOR_SIZE:
+        raise SnapshotError(f"Snapshot {path.name} stores {metadata.get('vector_size')}-d vectors, expected {VECTOR_SIZE}")
+    return {**metadata, "path": str(path)}
+
+def create_snapshot(
+    vector_store: VectorStore,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    include_models: bool = True,
+    keep: int = SNAPSHOT_KEEP
+) -> Path:
+    from logic.embedding import QUERY_EMBEDDING_CACHE, EMBEDDING_MODEL, ONNX_MODEL_DIR
+
+    started = time.perf_counter()
+    snapshot_dir = Path(snapshot_dir)
+    manifest = get_manifest_store()
+    data_version = manifest.data_version()
+    name = f"v{SNAPSHOT_FORMAT_VERSION}-{datetime.now().strftime('%Y%m%dT%H%M%S')}-d{data_version}"
+    staging = snapshot_dir / f".{name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    try:
+        files = {}
+        if isinstance(vector_store, LocalVectorStore):
+            files[INDEX_SUBDIR] = [path.name for path in vector_store.export_files(staging / INDEX_SUBDIR)]
+        manifest.backup_to(staging / MANIFEST_FILE)
+        get_dedup_index().backup_to(staging / DEDUP_FILE)
+
+        keys, vectors = QUERY_EMBEDDING_CACHE.export()
+        np.save(staging / CACHE_VECTORS_FILE, vectors)
+        with open(staging / CACHE_KEYS_FILE, "w", encoding="utf-8") as f:
+            json.dump(keys, f, ensure_ascii=False)
+
+        if include_models and ONNX_MODEL_DIR.exists():
+            shutil.copytree(ONNX_MODEL_DIR, staging / MODELS_SUBDIR, copy_function=_link_or_copy)
+            files[MODELS_SUBDIR] = sorted(str(path.relative_to(staging / MODELS_SUBDIR))
+                                          for path in (staging / MODELS_SUBDIR).rglob("*") if path.is_file())
+
+        metadata = {
+            "name": name,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "data_version": data_version,
+            "backend": "local" if isinstance(vector_store, LocalVectorStore) else "pinecone",
+            "index_name": vector_store.index_name,
+            "vectors": vector_store.count() if isinstance(vector_store, LocalVectorStore) else None,
+            "vector_size": VECTOR_SIZE,
+            "embedding_model": EMBEDDING_MODEL,
+            "cached_queries": len(keys),
+            "files": files
+        }
+        with open(staging / METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(staging, snapshot_dir / name)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _write_latest(snapshot_dir, name)
+    _prune(snapshot_dir, keep)
+    logging.info(f"Created snapshot {name} in {time.perf_counter() - started:.2f}s")
+    return snapshot_dir / name
+
+def restore_state(
+    snapshot: Dict[str, Any],
+    index_dir: Path = LOCAL_INDEX_DIR,
+    manifest_path: Path = MANIFEST_DB_PATH,
+    dedup_path: Path = DEDUP_INDEX_PATH
+) -> List[str]:
+    path, index_dir = Path(snapshot["path"]), Path(index_dir)
+    live = [Path(manifest_path), Path(dedup_path), index_dir / "vectors.npy", index_dir / "records.json"]
+    if any(target.exists() for target in live):
+        return []
+
+    restored = []
+    if (path / INDEX_SUBDIR).exists():
+        for source in (path / INDEX_SUBDIR).iterdir():
+            _link_or_copy(source, index_dir / source.name)
+        restored.append(INDEX_SUBDIR)
+    for name, target in [(MANIFEST_FILE, Path(manifest_path)), (DEDUP_FILE, Path(dedup_path))]:
+        if (path / name).exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path / name, target)
+            restored.append(name)
+    return restored
+
+def restore_warm_caches(snapshot: Dict[str, Any], model_dir: Optional[Path] = None) -> List[str]:
+    from logic.embedding import QUERY_EMBEDDING_CACHE, EMBEDDING_MODEL, ONNX_MODEL_DIR
+
+    path, model_dir = Path(snapshot["path"]), Path(model_dir or ONNX_MODEL_DIR)
+    if snapshot.get("embedding_model") != EMBEDDING_MODEL:
+        logging.warning(f"Snapshot {path.name} was built with {snapshot.get('embedding_model')}; skipping embedding caches")
+        return []
+
+    restored = []
+    if (path / CACHE_KEYS_FILE).exists():
+        with open(path / CACHE_KEYS_FILE, "r", encoding="utf-8") as f:
+            keys = json.load(f)
+        QUERY_EMBEDDING_CACHE.load(keys, np.load(path / CACHE_VECTORS_FILE, mmap_mode="r"))
+        restored.append("query_embeddings")
+    if (path / MODELS_SUBDIR).exists() and _restore_dir(path / MODELS_SUBDIR, model_dir):
+        restored.append(MODELS_SUBDIR)
+    return restored
+
+def restore_snapshot(path: Optional[Path] = None, snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    path = Path(path) if path else latest_snapshot(snapshot_dir)
+    if path is None:
+        return None
+    snapshot = read_snapshot(path)
+    restored = restore_state(snapshot) + restore_warm_caches(snapshot)
+    seconds = time.perf_counter() - started
+    logging.info(f"Restored {', '.join(restored) or 'nothing'} from snapshot {path.name} in {seconds:.2f}s")
+    return {**snapshot, "restored": restored, "restore_seconds": round(seconds, 3)}
+
+def vector_store_kwargs(snapshot: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if VECTOR_STORE_BACKEND != "pinecone" or not snapshot:
+        return {}
+    if snapshot.get("backend") == "pinecone" and snapshot.get("index_name") == DEFAULT_INDEX_NAME:
+        return {"skip_index_check": True}
+    return {}
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from core.vector_store import get_vector_store, configure_logging
+
+    load_dotenv()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Create, restore or list warm-start snapshots")
+    parser.add_argument("command", choices=["create", "restore", "list"])
+    parser.add_argument("--snapshot-dir", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--no-models", action="store_true")
+    parser.add_argument("--keep", type=int, default=SNAPSHOT_KEEP)
+    args = parser.parse_args()
+
+    if args.command == "create":
+        print(create_snapshot(get_vector_store(), args.snapshot_dir, not args.no_models, args.keep))
+    elif args.command == "restore":
+        print(json.dumps(restore_snapshot(args.path, args.snapshot_dir), ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(list_snapshots(args.snapshot_dir), ensure_ascii=False, indent=2))
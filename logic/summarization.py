@@ -0,0 +1,71 @@
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from typing import List, Optional
+import threading
+import logging
+import time
+import os
+
+INGEST_SUMMARIES = os.getenv("INGEST_SUMMARIES", "0") == "1"
+SUMMARY_MODEL_NAME = os.getenv("SUMMARY_MODEL_NAME", "gpt-4.1-mini")
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_REQUESTS_PER_MINUTE = float(os.getenv("SUMMARY_REQUESTS_PER_MINUTE", "120"))
+SUMMARY_FIELD = "summary"
+
+SUMMARY_PROMPT = """สรุปข้อมูล Feedback ต่อไปนี้จาก "ประเภท Feedback", "รายละเอียด Feedback", "แนวทางการดำเนินการ", และ "รายละเอียด Status"
+→ ความยาวไม่เกิน 4 บรรทัด
+→ ใช้ภาษาทางการ ชัดเจน และเข้าใจง่าย
+→ ห้ามแปลงตัวย่อของฝ่าย ห้ามคาดเดา หรือใช้ความรู้นอกข้อมูล
+→ ตอบเฉพาะข้อความสรุปเท่านั้น
+
+{record}
+"""
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self, requests: int = 1):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval * requests
+        if start > now:
+            time.sleep(start - now)
+
+def get_summary_llm(model_name: str = SUMMARY_MODEL_NAME) -> BaseLanguageModel:
+    from logic.qa_chain import QA_LLM_BACKEND, DEFAULT_TEMPERATURE
+
+    if QA_LLM_BACKEND == "fake":
+        return FakeListChatModel(responses=["สรุปข้อมูลจากระบบทดสอบ"])
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model_name, temperature=DEFAULT_TEMPERATURE)
+
+def summarize_records(
+    record_texts: List[str],
+    llm: Optional[BaseLanguageModel] = None,
+    batch_size: int = SUMMARY_BATCH_SIZE,
+    requests_per_minute: float = SUMMARY_REQUESTS_PER_MINUTE
+) -> List[str]:
+    llm = llm or get_summary_llm()
+    limiter = RateLimiter(requests_per_minute)
+    summaries: List[str] = []
+
+    for start in range(0, len(record_texts), batch_size):
+        batch = record_texts[start:start + batch_size]
+        limiter.acquire(len(batch))
+        results = llm.batch(
+            [SUMMARY_PROMPT.format(record=record) for record in batch],
+            config={"max_concurrency": batch_size},
+            return_exceptions=True
+        )
+        for record_index, result in enumerate(results, start=start):
+            if isinstance(result, Exception):
+                logging.warning(f"Summary generation failed for record {record_index}: {result}")
+                summaries.append("")
+            else:
+                summaries.append(str(getattr(result, "content", result)).strip())
+
+    return summaries
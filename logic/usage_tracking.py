@@ -0,0 +1,99 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+import threading
+import time
+
+MAX_RECENT_CALLS = 200
+
+def extract_prompt_usage(response: LLMResult) -> Tuple[int, int, int]:
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return (
+            token_usage.get("prompt_tokens", 0) or 0,
+            details.get("cached_tokens", 0) or 0,
+            token_usage.get("completion_tokens", 0) or 0
+        )
+
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0, usage.get("output_tokens", 0)
+    return 0, 0, 0
+
+def extract_message_usage(message: Any) -> Tuple[int, int, int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return usage.get("input_tokens", 0) or 0, details.get("cache_read", 0) or 0, usage.get("output_tokens", 0) or 0
+
+class PromptCacheTracker(BaseCallbackHandler):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, float] = {}
+        self._recent: List[Dict[str, Any]] = []
+        self._totals = {
+            "calls": 0,
+            "cached_calls": 0,
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_latency_ms": 0.0,
+            "uncached_latency_ms": 0.0
+        }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        prompt_tokens, cached_tokens, completion_tokens = extract_prompt_usage(response)
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            latency_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+            self._record(prompt_tokens, cached_tokens, completion_tokens, latency_ms)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started.pop(run_id, None)
+
+    def _record(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int, latency_ms: float):
+        cached = cached_tokens > 0
+        self._totals["calls"] += 1
+        self._totals["cached_calls"] += int(cached)
+        self._totals["prompt_tokens"] += prompt_tokens
+        self._totals["cached_prompt_tokens"] += cached_tokens
+        self._totals["completion_tokens"] += completion_tokens
+        self._totals["cached_latency_ms" if cached else "uncached_latency_ms"] += latency_ms
+        self._recent.append({
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "uncached_prompt_tokens": prompt_tokens - cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency_ms, 2)
+        })
+        del self._recent[:-MAX_RECENT_CALLS]
+
+    def get_stats(self, recent: Optional[int] = 10) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+            recent_calls = list(self._recent[-recent:]) if recent else []
+        cached_calls = totals["cached_calls"]
+        uncached_calls = totals["calls"] - cached_calls
+        return {
+            **totals,
+            "uncached_prompt_tokens": totals["prompt_tokens"] - totals["cached_prompt_tokens"],
+            "cached_token_ratio": totals["cached_prompt_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0,
+            "mean_cached_latency_ms": totals["cached_latency_ms"] / cached_calls if cached_calls else 0.0,
+            "mean_uncached_latency_ms": totals["uncached_latency_ms"] / uncached_calls if uncached_calls else 0.0,
+            "recent": recent_calls
+        }
+
+PROMPT_CACHE_TRACKER = PromptCacheTracker()
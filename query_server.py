@@ -0,0 +1,256 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Iterator, Optional
+from dotenv import load_dotenv
+import argparse
+import threading
+import logging
+import signal
+import socket
+import json
+import time
+import os
+
+load_dotenv()
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+MAX_QUERY_LENGTH = 2000
+
+class QueryService:
+    def __init__(self):
+        from core.vector_store import get_vector_store
+        from core.manifest_store import get_manifest_store
+        from logic.qa_chain import get_qa_chain
+        from logic.routing import get_routed_qa_chain, ROUTER_ENABLED
+        from logic.coalescing import CoalescingQAChain
+        from logic.snapshot import vector_store_kwargs
+        from utils.startup import restore_snapshot_on_boot
+
+        self.vector_store = get_vector_store(**vector_store_kwargs(restore_snapshot_on_boot()))
+        qa_chain = get_routed_qa_chain(self.vector_store) if ROUTER_ENABLED else get_qa_chain(self.vector_store)
+        self.qa_chain = CoalescingQAChain(qa_chain, get_manifest_store().data_version)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "errors": 0, "streams": 0, "in_flight": 0, "latency_ms_total": 0.0}
+
+    def warm_up(self):
+        from utils.startup import warm_up_in_background
+        warm_up_in_background().join()
+
+    def _begin(self, stream: bool = False):
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["in_flight"] += 1
+            if stream:
+                self._metrics["streams"] += 1
+
+    def _end(self, started: float, error: bool = False):
+        with self._lock:
+            self._metrics["in_flight"] -= 1
+            self._metrics["latency_ms_total"] += (time.perf_counter() - started) * 1000
+            if error:
+                self._metrics["errors"] += 1
+
+    def answer(self, query: str) -> Dict[str, Any]:
+        from logic.exhaustive import is_exhaustive_request
+
+        started = time.perf_counter()
+        self._begin()
+        try:
+            if is_exhaustive_request(query):
+                response = {"result": "".join(self.qa_chain.stream(query))}
+            else:
+                response = self.qa_chain.invoke({"query": query})
+        except Exception:
+            self._end(started, error=True)
+            raise
+        self._end(started)
+        return {
+            "result": response["result"],
+            "sources": [doc.metadata for doc in response.get("source_documents", [])],
+            "route": response.get("route"),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def stream(self, query: str) -> Iterator[str]:
+        started = time.perf_counter()
+        self._begin(stream=True)
+        error = False
+        try:
+            yield from self.qa_chain.stream(query)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._end(started, error=error)
+
+    def metrics(self) -> Dict[str, Any]:
+        from logic.embedding import get_query_embedding_model, QUERY_EMBEDDING_CACHE
+        from logic.coalescing import SINGLE_FLIGHT
+        from logic.usage_tracking import PROMPT_CACHE_TRACKER
+        from logic.routing import ROUTE_STATS
+
+        with self._lock:
+            metrics = dict(self._metrics)
+        completed = metrics["requests"] - metrics["in_flight"]
+        metrics["mean_latency_ms"] = metrics["latency_ms_total"] / completed if completed else 0.0
+        metrics["worker_pid"] = os.getpid()
+        metrics["uptime_seconds"] = round(time.time() - self.started, 1)
+        metrics["query_embedding_cache"] = QUERY_EMBEDDING_CACHE.get_stats()
+        metrics["single_flight"] = SINGLE_FLIGHT.get_stats()
+        metrics["prompt_cache"] = PROMPT_CACHE_TRACKER.get_stats()
+        metrics["routing"] = ROUTE_STATS.get_stats()
+        embedder = get_query_embedding_model()
+        if hasattr(embedder, "get_stats"):
+            metrics["query_embedding_batches"] = embedder.get_stats()
+        return metrics
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    service: Optional[QueryService] = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args):
+        logging.info(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_query(self) -> Optional[str]:
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Request body must be JSON"})
+            return None
+        query = str(payload.get("query", "")).strip()
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            self._send_json(400, {"error": f"'query' must be 1-{MAX_QUERY_LENGTH} characters"})
+            return None
+        return query
+
+    def _send_event(self, data: Dict[str, Any], event: Optional[str] = None):
+        message = ""
+        if event:
+            message += f"event: {event}\n"
+        message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        chunk = message.encode("utf-8")
+        self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok", "worker_pid": os.getpid()})
+        elif self.path == "/readyz":
+            from utils.startup import get_readiness
+            readiness = get_readiness()
+            self._send_json(200 if readiness["ready"] else 503, readiness)
+        elif self.path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path == "/v1/query":
+            query = self._read_query()
+            if query is None:
+                return
+            try:
+                self._send_json(200, self.service.answer(query))
+            except Exception as e:
+                logging.error(f"Query failed: {e}")
+                self._send_json(500, {"error": str(e)})
+        elif self.path == "/v1/query/stream":
+            query = self._read_query()
+            if query is None:
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            tokens = self.service.stream(query)
+            try:
+                for token in tokens:
+                    self._send_event({"token": token})
+                self._send_event({}, event="done")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                tokens.close()
+                logging.info("Client disconnected from the stream")
+            except Exception as e:
+                logging.error(f"Streaming query failed: {e}")
+                try:
+                    self._send_event({"error": str(e)}, event="error")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+def serve(listener: socket.socket):
+    from core.vector_store import configure_logging
+
+    configure_logging()
+    QueryRequestHandler.service = QueryService()
+    QueryRequestHandler.service.warm_up()
+
+    server = ThreadingHTTPServer(listener.getsockname(), QueryRequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = listener
+    server.daemon_threads = True
+    logging.info(f"Query service worker {os.getpid()} listening on {listener.getsockname()}")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+
+def run(host: str, port: int, workers: int):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(128)
+
+    from utils.startup import restore_snapshot_on_boot
+    restore_snapshot_on_boot()
+    if workers <= 1:
+        serve(listener)
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            serve(listener)
+            os._exit(0)
+        children.append(pid)
+
+    def stop(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="HTTP query service for the HR feedback chatbot")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Number of pre-forked worker processes")
+    parser.add_argument("--fake", action="store_true", help="Use fake LLM and embeddings with the local vector store")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.fake:
+        os.environ["QA_LLM_BACKEND"] = "fake"
+        os.environ["EMBEDDING_BACKEND"] = "fake"
+        os.environ["VECTOR_STORE_BACKEND"] = "local"
+    run(args.host, args.port, args.workers)
@@ -0,0 +1,31 @@
+from datetime import timedelta
+from utils import auth
+import pytest
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    auth._verified_tokens.clear()
+    auth._revoked_tokens.clear()
+    yield
+    auth._verified_tokens.clear()
+    auth._revoked_tokens.clear()
+
+def test_issuing_a_token_evicts_expired_tokens(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_TOKEN_TTL", timedelta(seconds=-1))
+    expired = [auth.issue_session_token("user", "hr_user") for _ in range(5)]
+    monkeypatch.setattr(auth, "AUTH_TOKEN_TTL", timedelta(hours=1))
+
+    token = auth.issue_session_token("user", "hr_user")
+    assert list(auth._verified_tokens) == [token]
+    assert auth.verify_session_token(token) == ("user", "hr_user")
+    assert all(auth.verify_session_token(old) is None for old in expired)
+
+def test_revoking_a_token_evicts_expired_revocations(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_TOKEN_TTL", timedelta(seconds=-1))
+    auth.revoke_session_token(auth.issue_session_token("user", "hr_user"))
+    monkeypatch.setattr(auth, "AUTH_TOKEN_TTL", timedelta(hours=1))
+
+    token = auth.issue_session_token("user", "hr_user")
+    auth.revoke_session_token(token)
+    assert list(auth._revoked_tokens) == [token]
+    assert auth.verify_session_token(token) is None
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from logic.coalescing import SingleFlight
+import threading
+import time
+
+DISTINCT_KEYS = 12
+TIMEOUT = 10.0
+
+def wait_for_followers(single_flight: SingleFlight, count: int):
+    deadline = time.monotonic() + TIMEOUT
+    while single_flight.get_stats()["coalesced"] < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+def test_distinct_keys_run_concurrently_in_their_callers():
+    single_flight = SingleFlight()
+    barrier = threading.Barrier(DISTINCT_KEYS)
+    callers = {}
+
+    def answer(key: int) -> int:
+        callers[key] = threading.current_thread().name
+        barrier.wait(timeout=TIMEOUT)
+        return key
+
+    def ask(key: int):
+        return single_flight.do(key, lambda: answer(key), TIMEOUT), threading.current_thread().name
+
+    with ThreadPoolExecutor(max_workers=DISTINCT_KEYS) as pool:
+        results = list(pool.map(ask, range(DISTINCT_KEYS)))
+    assert [result for result, _ in results] == list(range(DISTINCT_KEYS))
+    assert all(callers[key] == thread for key, (_, thread) in enumerate(results))
+    assert single_flight.get_stats()["in_flight"] == 0
+
+def test_followers_share_the_leader_result():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def answer() -> str:
+        calls.append(1)
+        started.set()
+        release.wait(TIMEOUT)
+        return "shared"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(single_flight.do, "q", answer, TIMEOUT)
+        started.wait(TIMEOUT)
+        followers = [pool.submit(single_flight.do, "q", answer, TIMEOUT) for _ in range(3)]
+        wait_for_followers(single_flight, 3)
+        release.set()
+        assert [future.result() for future in [leader, *followers]] == ["shared"] * 4
+    assert calls == [1]
+
+def test_stream_followers_receive_every_token():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def tokens():
+        yield "a"
+        started.set()
+        release.wait(TIMEOUT)
+        yield "b"
+
+    leader = single_flight.do_stream("q", tokens, TIMEOUT)
+    assert next(leader) == "a"
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        follower = pool.submit(lambda: "".join(single_flight.do_stream("q", tokens, TIMEOUT)))
+        wait_for_followers(single_flight, 1)
+        release.set()
+        assert "".join(leader) == "b"
+        assert follower.result(TIMEOUT) == "ab"
+    assert single_flight.get_stats()["in_flight"] == 0
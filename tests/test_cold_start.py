@@ -0,0 +1,35 @@
+from pathlib import Path
+import subprocess
+import json
+import sys
+import os
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+
+RENDER_LOGIN_PAGE = """
+import json
+from streamlit.testing.v1 import AppTest
+from utils.startup import loaded_heavy_modules
+
+app = AppTest.from_file({app!r}, default_timeout=60).run()
+print(json.dumps({{
+    "exceptions": [e.value for e in app.exception],
+    "inputs": [text_input.key for text_input in app.text_input],
+    "heavy": loaded_heavy_modules()
+}}))
+"""
+
+def render_login_page(tmp_path: Path) -> dict:
+    (tmp_path / "icon").symlink_to(REPO_DIR / "icon", target_is_directory=True)
+    env = {**os.environ, "PYTHONPATH": str(REPO_DIR), "SNAPSHOT_RESTORE_ON_BOOT": "0"}
+    output = subprocess.run(
+        [sys.executable, "-c", RENDER_LOGIN_PAGE.format(app=str(REPO_DIR / "app.py"))],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_login_page_does_not_import_heavy_modules(tmp_path):
+    result = render_login_page(tmp_path)
+    assert result["exceptions"] == []
+    assert result["inputs"] == ["username_input", "password_input"]
+    assert result["heavy"] == []
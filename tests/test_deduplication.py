@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Dict
+from core.vector_store import LocalVectorStore
+from core.dedup_index import NearDuplicateIndex, get_dedup_index, DEDUP_INDEX_PATH
+from logic.ingestion import prepare_workbook, index_prepared_file, delete_indexed_file
+from logic.processing_benchmark import make_sample_sheet
+from logic.embedding import get_embedding_model
+import pytest
+
+ROWS = 30
+
+@pytest.fixture
+def workspace(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    get_dedup_index.cache_clear()
+    for name in ["a.xlsx", "b.xlsx"]:
+        make_sample_sheet(ROWS, extra_columns=0, seed=7).to_excel(tmp_path / name, index=False)
+    yield tmp_path
+    get_dedup_index.cache_clear()
+
+def filenames(store: LocalVectorStore) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for page in store.iter_ids():
+        for metadata in store.fetch_metadata(page).values():
+            counts[metadata["filename"]] = counts.get(metadata["filename"], 0) + 1
+    return counts
+
+def cli_dedup_ingest(workspace: Path, store: LocalVectorStore) -> int:
+    index = NearDuplicateIndex(DEDUP_INDEX_PATH)
+    embeddings = get_embedding_model("fake")
+    infos = [
+        index_prepared_file(prepare_workbook(workspace / name), store, embeddings, summarize=False, dedup=True, dedup_index=index)
+        for name in ["a.xlsx", "b.xlsx"]
+    ]
+    assert infos[1]["duplicates"] == infos[1]["chunks"]
+    assert set(filenames(store)) == {"a.xlsx"}
+    return store.count()
+
+def test_app_delete_after_cli_dedup_ingest_keeps_duplicates(workspace):
+    store = LocalVectorStore(workspace / "index")
+    canonical = cli_dedup_ingest(workspace, store)
+
+    delete_indexed_file("a.xlsx", store)
+    assert store.count() == canonical
+    assert filenames(store) == {"b.xlsx": canonical}
+
+def test_app_reupload_without_dedup_keeps_duplicates(workspace):
+    store = LocalVectorStore(workspace / "index")
+    canonical = cli_dedup_ingest(workspace, store)
+
+    prepared = prepare_workbook(workspace / "a.xlsx")
+    index_prepared_file(prepared, store, get_embedding_model("fake"), summarize=False, dedup=False)
+    assert filenames(store) == {"b.xlsx": canonical, "a.xlsx": len(prepared.chunks)}
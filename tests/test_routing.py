@@ -0,0 +1,133 @@
+from typing import Any, List, Optional
+from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from logic.routing import (
+    QueryRouter, RouteStatsTracker, RouteDecision, ModelTier, classify_query, estimate_cost,
+    ROUTER_NO_MATCH_SCORE, ROUTER_FAST_SCORE, ROUTER_TEMPLATE_SCORE, ROUTER_MIN_MARGIN, ROUTER_FAST_MAX_CHARS,
+    MAX_RECENT_ROUTES
+)
+from logic.summarization import SUMMARY_FIELD
+from logic.exhaustive import NOT_FOUND
+import pytest
+
+RECORD = "BU: CNBO\nประเภท Feedback: Career Management\nรายละเอียด Feedback: ระบบ COACH\nStatus: อยู่ระหว่างดำเนินการ"
+
+TIERS = {
+    "template": ModelTier("template", None, 1.0),
+    "fast": ModelTier("fast", "gpt-4.1-nano", 5.0, fallback="standard"),
+    "standard": ModelTier("standard", "gpt-4.1-mini", 5.0, fallback="template")
+}
+
+class FailingChatModel(FakeListChatModel):
+    def _call(self, *args: Any, **kwargs: Any) -> str:
+        raise RuntimeError("model unavailable")
+
+class StaticRetriever:
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+
+    def retrieve(self, query: str, context: Optional[Any] = None, follow_up: bool = False) -> List[Document]:
+        return self.documents
+
+def documents(*scores: float, summary: str = "") -> List[Document]:
+    metadata = {SUMMARY_FIELD: summary} if summary else {}
+    return [Document(page_content=RECORD, metadata={"score": score, **metadata}) for score in scores]
+
+def make_router(docs: List[Document], tracker: RouteStatsTracker, **llms) -> QueryRouter:
+    return QueryRouter(StaticRetriever(docs), tiers=TIERS, llms=llms, tracker=tracker)
+
+@pytest.mark.parametrize("query, scores, summary, tier, reason", [
+    ("COACH", (), "", "template", "no_match"),
+    ("COACH", (ROUTER_NO_MATCH_SCORE - 0.01,), "", "template", "no_match"),
+    ("สรุปภาพรวม COACH", (0.9, 0.5), "", "standard", "synthesis"),
+    ("x" * (ROUTER_FAST_MAX_CHARS + 1), (0.9, 0.5), "", "standard", "synthesis"),
+    ("COACH", (ROUTER_TEMPLATE_SCORE, ROUTER_TEMPLATE_SCORE - ROUTER_MIN_MARGIN - 0.01), "สรุป", "template", "exact_lookup"),
+    ("COACH", (ROUTER_TEMPLATE_SCORE, 0.5), "", "fast", "single_record"),
+    ("COACH", (ROUTER_FAST_SCORE, ROUTER_FAST_SCORE - ROUTER_MIN_MARGIN - 0.01), "", "fast", "single_record"),
+    ("COACH", (ROUTER_FAST_SCORE - 0.01, 0.1), "", "standard", "ambiguous"),
+    ("COACH", (0.9, 0.89), "สรุป", "standard", "ambiguous"),
+])
+def test_classify_query_thresholds(query, scores, summary, tier, reason):
+    decision = classify_query(query, documents(*scores, summary=summary))
+    assert (decision.tier, decision.reason) == (tier, reason)
+    assert decision.query_chars == len(query)
+
+def test_fast_tier_answers_single_record():
+    tracker = RouteStatsTracker()
+    router = make_router(documents(0.7, 0.4), tracker, fast=FakeListChatModel(responses=["fast answer"]))
+    result = router.invoke({"query": "COACH"})
+    assert result["result"] == "fast answer"
+    assert result["route"]["served_by"] == "fast"
+    assert tracker.get_stats()["tiers"]["fast"]["calls"] == 1
+
+def test_invoke_falls_back_from_fast_to_standard():
+    tracker = RouteStatsTracker()
+    router = make_router(
+        documents(0.7, 0.4), tracker,
+        fast=FailingChatModel(responses=[]), standard=FakeListChatModel(responses=["standard answer"])
+    )
+    result = router.invoke({"query": "COACH"})
+    assert result["result"] == "standard answer"
+    assert result["route"]["tier"] == "fast"
+    assert result["route"]["served_by"] == "standard"
+
+    tiers = tracker.get_stats()["tiers"]
+    assert tiers["fast"]["errors"] == 1 and tiers["fast"]["fallback_calls"] == 0
+    assert tiers["standard"]["errors"] == 0 and tiers["standard"]["fallback_calls"] == 1
+
+def test_invoke_falls_back_to_template_when_every_model_fails():
+    tracker = RouteStatsTracker()
+    router = make_router(
+        documents(0.7, 0.4), tracker,
+        fast=FailingChatModel(responses=[]), standard=FailingChatModel(responses=[])
+    )
+    result = router.invoke({"query": "COACH"})
+    assert result["route"]["served_by"] == "template"
+    assert "CNBO" in result["result"] and result["result"] != NOT_FOUND
+
+    stats = tracker.get_stats()
+    assert {name: tier["calls"] for name, tier in stats["tiers"].items()} == {"fast": 1, "standard": 1, "template": 1}
+    assert [route["served_by"] for route in stats["recent"]] == ["fast", "standard", "template"]
+    assert [route["error"] for route in stats["recent"]] == ["RuntimeError", "RuntimeError", None]
+
+def test_stream_falls_back_before_any_token_is_emitted():
+    tracker = RouteStatsTracker()
+    router = make_router(
+        documents(0.7, 0.4), tracker,
+        fast=FailingChatModel(responses=[]), standard=FakeListChatModel(responses=["streamed"])
+    )
+    assert "".join(router.stream("COACH")) == "streamed"
+    tiers = tracker.get_stats()["tiers"]
+    assert tiers["fast"]["errors"] == 1
+    assert tiers["standard"]["calls"] == 1 and tiers["standard"]["fallback_calls"] == 1
+
+def test_no_match_uses_template_without_calling_a_model():
+    tracker = RouteStatsTracker()
+    router = make_router([], tracker, fast=FailingChatModel(responses=[]), standard=FailingChatModel(responses=[]))
+    result = router.invoke({"query": "COACH"})
+    assert result["result"] == NOT_FOUND
+    assert list(tracker.get_stats()["tiers"]) == ["template"]
+
+def test_tracker_accumulates_latency_tokens_and_cost():
+    tracker = RouteStatsTracker()
+    decision = RouteDecision("fast", "single_record", 0.7, 0.3, 5)
+    tier = TIERS["fast"]
+    tracker.record(tier, decision, 10.0, usage=(1000, 400, 100))
+    tracker.record(tier, decision, 30.0, usage=(1000, 0, 100), error=RuntimeError("boom"), fallback=True)
+
+    stats = tracker.get_stats()["tiers"]["fast"]
+    assert stats["calls"] == 2 and stats["errors"] == 1 and stats["fallback_calls"] == 1
+    assert stats["prompt_tokens"] == 2000 and stats["cached_prompt_tokens"] == 400 and stats["completion_tokens"] == 200
+    assert stats["mean_latency_ms"] == pytest.approx(20.0)
+    expected = estimate_cost("gpt-4.1-nano", 1000, 400, 100) + estimate_cost("gpt-4.1-nano", 1000, 0, 100)
+    assert stats["cost_usd"] == pytest.approx(expected)
+    assert stats["mean_cost_usd"] == pytest.approx(expected / 2)
+
+def test_tracker_keeps_only_recent_routes():
+    tracker = RouteStatsTracker()
+    decision = RouteDecision("template", "no_match", 0.0, 0.0, 5)
+    for _ in range(MAX_RECENT_ROUTES + 5):
+        tracker.record(TIERS["template"], decision, 1.0)
+    assert tracker.get_stats()["tiers"]["template"]["calls"] == MAX_RECENT_ROUTES + 5
+    assert len(tracker.get_stats(recent=None)["recent"]) == 0
+    assert len(tracker.get_stats(recent=MAX_RECENT_ROUTES * 2)["recent"]) == MAX_RECENT_ROUTES
@@ -3,30 +3,125 @@ import os
 from dotenv import load_dotenv, set_key
 import bcrypt
 from functools import wraps
-import json
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import threading
+import secrets
+import base64
+import hashlib
+import hmac
 
 load_dotenv()
 
-AUTH_STORE_PATH = Path("data") / "auth_state.json"
-AUTH_STORE_PATH.parent.mkdir(exist_ok=True)
 ENV_FILE_PATH = Path(".env")
+AUTH_TOKEN_SECRET = (os.getenv("AUTH_TOKEN_SECRET") or secrets.token_hex(32)).encode("utf-8")
+AUTH_TOKEN_TTL = timedelta(hours=24)
+AUTH_QUERY_PARAM = "session"
+AUTH_TOKEN_IN_URL = os.getenv("AUTH_TOKEN_IN_URL", "1") == "1"
+CREDENTIAL_ENV_VARS = ("HR_USERNAME", "HR_PASSWORD_HASH", "HR_ADMIN_USERNAME", "HR_ADMIN_PASSWORD_HASH")
+
+_credentials_lock = threading.Lock()
+_credentials_cache: Optional[Dict[str, Dict[str, str]]] = None
+
+_token_lock = threading.Lock()
+_verified_tokens: Dict[str, Tuple[str, str, datetime]] = {}
+_revoked_tokens: Dict[str, datetime] = {}
 
 def get_credentials():
-    hr_username = os.getenv('HR_USERNAME')
-    hr_password_hash = os.getenv('HR_PASSWORD_HASH')
-    admin_username = os.getenv('HR_ADMIN_USERNAME')
-    admin_password_hash = os.getenv('HR_ADMIN_PASSWORD_HASH')
+    global _credentials_cache
+    with _credentials_lock:
+        if _credentials_cache is not None:
+            return _credentials_cache
+
+        hr_username = os.getenv('HR_USERNAME')
+        hr_password_hash = os.getenv('HR_PASSWORD_HASH')
+        admin_username = os.getenv('HR_ADMIN_USERNAME')
+        admin_password_hash = os.getenv('HR_ADMIN_PASSWORD_HASH')
+
+        if not all([hr_username, hr_password_hash, admin_username, admin_password_hash]):
+            st.error("❌ Authentication credentials not configured properly")
+            st.stop()
+
+        _credentials_cache = {
+            'hr_user': {'username': hr_username, 'password_hash': hr_password_hash},
+            'admin': {'username': admin_username, 'password_hash': admin_password_hash}
+        }
+        return _credentials_cache
+
+def refresh_credentials():
+    global _credentials_cache
+    with _credentials_lock:
+        _credentials_cache = None
+    with _token_lock:
+        _verified_tokens.clear()
+
+def credentials_version() -> str:
+    material = "\x00".join(os.getenv(name, "") for name in CREDENTIAL_ENV_VARS)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+def _sign(payload: str) -> str:
+    return hmac.new(AUTH_TOKEN_SECRET, payload.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def _prune_expired_tokens(now: datetime):
+    for token, (_, _, expiry) in list(_verified_tokens.items()):
+        if expiry <= now:
+            del _verified_tokens[token]
+    for token, expiry in list(_revoked_tokens.items()):
+        if expiry <= now:
+            del _revoked_tokens[token]
+
+def issue_session_token(username: str, user_type: str) -> str:
+    now = datetime.now()
+    expiry = now + AUTH_TOKEN_TTL
+    raw = "|".join([username, user_type, expiry.isoformat(), credentials_version(), secrets.token_hex(8)])
+    payload = base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+    token = f"{payload}.{_sign(payload)}"
+    with _token_lock:
+        _prune_expired_tokens(now)
+        _verified_tokens[token] = (username, user_type, expiry)
+    return token
+
+def verify_session_token(token: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not token:
+        return None
+    now = datetime.now()
+
+    with _token_lock:
+        cached = _verified_tokens.get(token)
+        if cached:
+            username, user_type, expiry = cached
+            if expiry > now:
+                return username, user_type
+            del _verified_tokens[token]
+            return None
+        if token in _revoked_tokens:
+            return None
+
+    try:
+        payload, signature = token.rsplit(".", 1)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        username, user_type, expiry_text, version, _ = base64.urlsafe_b64decode(payload).decode("utf-8").split("|")
+        expiry = datetime.fromisoformat(expiry_text)
+    except Exception:
+        return None
+
+    if expiry <= now or not hmac.compare_digest(version, credentials_version()):
+        return None
 
-    if not all([hr_username, hr_password_hash, admin_username, admin_password_hash]):
-        st.error("❌ Authentication credentials not configured properly")
-        st.stop()
+    with _token_lock:
+        _verified_tokens[token] = (username, user_type, expiry)
+    return username, user_type
 
-    return {
-        'hr_user': {'username': hr_username, 'password_hash': hr_password_hash},
-        'admin': {'username': admin_username, 'password_hash': admin_password_hash}
-    }
+def revoke_session_token(token: Optional[str]):
+    if not token:
+        return
+    now = datetime.now()
+    with _token_lock:
+        _verified_tokens.pop(token, None)
+        _prune_expired_tokens(now)
+        _revoked_tokens[token] = now + AUTH_TOKEN_TTL
 
 def hash_password(password: str) -> str:
     salt = bcrypt.gensalt()
@@ -46,6 +141,7 @@ def update_hr_user_password(new_password: str) -> bool:
         new_hash = hash_password(new_password)
         set_key(ENV_FILE_PATH, 'HR_PASSWORD_HASH', new_hash)
         load_dotenv(override=True)
+        refresh_credentials()
         return True
     except Exception as e:
         st.error(f"Error updating password: {e}")
@@ -71,35 +167,33 @@ def initialize_auth_state():
         st.session_state.username = None
     if 'user_type' not in st.session_state:
         st.session_state.user_type = None
-    
-    auth_data = load_auth_data()
-    if auth_data:
-        if 'expiry' in auth_data and datetime.fromisoformat(auth_data['expiry']) > datetime.now():
-            st.session_state.authenticated = True
-            st.session_state.username = auth_data.get('username')
-            st.session_state.user_type = auth_data.get('user_type')
-
-def load_auth_data():
-    try:
-        if AUTH_STORE_PATH.exists():
-            with open(AUTH_STORE_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        return None
-    return None
+    if 'auth_token' not in st.session_state:
+        st.session_state.auth_token = None
 
-def save_auth_data(username: str, user_type: str):
-    try:
-        expiry = (datetime.now() + timedelta(hours=24)).isoformat()
-        auth_data = {
-            'username': username,
-            'user_type': user_type,
-            'expiry': expiry
-        }
-        with open(AUTH_STORE_PATH, "w", encoding="utf-8") as f:
-            json.dump(auth_data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        st.error(f"Error saving auth state: {e}")
+    token = st.session_state.auth_token or (st.query_params.get(AUTH_QUERY_PARAM) if AUTH_TOKEN_IN_URL else None)
+    verified = verify_session_token(token)
+    if verified:
+        st.session_state.authenticated = True
+        st.session_state.username, st.session_state.user_type = verified
+        st.session_state.auth_token = token
+    else:
+        clear_auth_state()
+
+def clear_auth_state():
+    st.session_state.authenticated = False
+    st.session_state.username = None
+    st.session_state.user_type = None
+    st.session_state.auth_token = None
+
+def start_session(username: str, user_type: str):
+    token = issue_session_token(username, user_type)
+    st.session_state.authenticated = True
+    st.session_state.username = username
+    st.session_state.user_type = user_type
+    st.session_state.auth_token = token
+    st.query_params.clear()
+    if AUTH_TOKEN_IN_URL:
+        st.query_params[AUTH_QUERY_PARAM] = token
 
 def is_authenticated() -> bool:
     initialize_auth_state()
@@ -152,13 +246,8 @@ def show_admin_panel():
                     else:
                         if update_hr_user_password(new_password):
                             st.success("✅ Password updated successfully!")
-                            st.session_state.authenticated = False
-                            st.session_state.username = None
-                            st.session_state.user_type = None
-                            try:
-                                AUTH_STORE_PATH.unlink()
-                            except Exception:
-                                pass
+                            clear_auth_state()
+                            st.query_params.clear()
                             st.rerun()
                         else:
                             st.error("❌ Failed to update password")
@@ -197,17 +286,13 @@ def show_login_form():
                             user_type, auth_username = authenticate_user(username, password)
                             
                             if user_type:
-                                st.session_state.authenticated = True
-                                st.session_state.username = auth_username
-                                st.session_state.user_type = user_type
-                                save_auth_data(auth_username, user_type)
+                                start_session(auth_username, user_type)
                                 
                                 if user_type == 'admin':
                                     st.success("✅ Admin login successful!")
                                 else:
                                     st.success("✅ Login successful!")
                                 
-                                st.query_params.clear()
                                 st.rerun()
                             else:
                                 st.error("❌ Incorrect username or password")
@@ -215,13 +300,8 @@ def show_login_form():
                             st.error(f"An error occurred: {str(e)}")
 
 def logout():
-    st.session_state.authenticated = False
-    st.session_state.username = None
-    st.session_state.user_type = None
-    try:
-        AUTH_STORE_PATH.unlink()
-    except Exception:
-        pass
+    revoke_session_token(st.session_state.get('auth_token'))
+    clear_auth_state()
     st.success("👋 Logged out successfully! Redirecting...")
     st.query_params.clear()
     st.rerun()
@@ -0,0 +1,62 @@
+from typing import Dict, Any, Iterator
+import urllib.request
+import urllib.error
+import json
+import os
+
+QUERY_API_URL = os.getenv("QUERY_API_URL", "")
+QUERY_API_TIMEOUT = float(os.getenv("QUERY_API_TIMEOUT", "120"))
+
+class QueryServiceError(RuntimeError):
+    pass
+
+class QueryServiceClient:
+    def __init__(self, base_url: str = QUERY_API_URL, timeout: float = QUERY_API_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path: str, payload: Dict[str, Any]):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except Exception:
+                message = str(e)
+            raise QueryServiceError(message) from e
+
+    def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._post("/v1/query", {"query": inputs["query"]}) as response:
+            payload = json.loads(response.read())
+        return {
+            "query": inputs["query"],
+            "result": payload["result"],
+            "sources": payload.get("sources", []),
+            "route": payload.get("route")
+        }
+
+    def stream(self, query: str) -> Iterator[str]:
+        with self._post("/v1/query/stream", {"query": query}) as response:
+            event = None
+            for raw_line in response:
+                line = raw_line.decode("utf-8").rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "error":
+                        raise QueryServiceError(data.get("error", "Streaming query failed"))
+                    if event == "done":
+                        return
+                    yield data.get("token", "")
+                    event = None
+
+    def health(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(self.base_url + "/healthz", timeout=self.timeout) as response:
+            return json.loads(response.read())
@@ -1,39 +1,21 @@
-from datetime import datetime
 import streamlit as st
-from typing import Dict, Any
-import json
+from collections import OrderedDict
+from typing import Dict, Any, List
 from pathlib import Path
+from core.manifest_store import get_manifest_store
+from logic.conversation import ConversationContext
 
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
-
-DATA_SOURCES_PATH = DATA_DIR / "data_sources.json"
+MAX_RETRIEVAL_CONTEXTS = 10
 
 def load_data_sources() -> Dict[str, Any]:
     try:
-        if DATA_SOURCES_PATH.exists():
-            with open(DATA_SOURCES_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for key, val in data.items():
-                    if isinstance(val, dict) and "uploaded_at" in val and isinstance(val["uploaded_at"], str):
-                        val["uploaded_at"] = datetime.fromisoformat(val["uploaded_at"])
-                return data
+        return get_manifest_store().summaries()
     except Exception as e:
         st.error(f"Error loading data sources: {e}")
     return {}
 
-def save_data_sources(data: Dict[str, Any]):
-    def default_converter(o):
-        if isinstance(o, datetime):
-            return o.isoformat()
-        return str(o)
-
-    try:
-        with open(DATA_SOURCES_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=default_converter)
-    except Exception as e:
-        st.error(f"Error saving data sources: {e}")
-
 def init_session_state():
     defaults = {
         'vectordb': None, 
@@ -49,14 +31,40 @@ def init_session_state():
         if key not in st.session_state:
             st.session_state[key] = value
 
-def remove_data_source(filename: str):
-    if 'data_sources' in st.session_state and filename in st.session_state.data_sources:
-        del st.session_state.data_sources[filename]
-        save_data_sources(st.session_state.data_sources)
+def get_retrieval_context(chat_id: str) -> ConversationContext:
+    if 'retrieval_contexts' not in st.session_state:
+        st.session_state.retrieval_contexts = OrderedDict()
+    contexts = st.session_state.retrieval_contexts
+    data_version = get_manifest_store().data_version()
+    context = contexts.pop(chat_id, None)
+    if context is None or context.data_version != data_version:
+        context = ConversationContext(data_version)
+    contexts[chat_id] = context
+    while len(contexts) > MAX_RETRIEVAL_CONTEXTS:
+        contexts.popitem(last=False)
+    return context
+
+def remove_data_source(filename: str) -> List[str]:
+    removed_chunk_ids = []
+    try:
+        removed_chunk_ids = get_manifest_store().remove_file(filename)
+    except Exception as e:
+        st.error(f"Error saving data sources: {e}")
+    if 'data_sources' in st.session_state:
+        st.session_state.data_sources.pop(filename, None)
+    return removed_chunk_ids
 
-def update_data_sources(file_info: Dict[str, Any]):
+def update_data_sources(file_info: Dict[str, Any]) -> List[str]:
     if 'data_sources' not in st.session_state or not st.session_state.data_sources:
         st.session_state.data_sources = {}
 
-    st.session_state.data_sources.update(file_info)
-    save_data_sources(st.session_state.data_sources)
\ No newline at end of file
+    store = get_manifest_store()
+    replaced_chunk_ids = []
+    for filename, info in file_info.items():
+        try:
+            replaced_chunk_ids.extend(store.upsert_file({**info, "filename": filename}))
+        except Exception as e:
+            st.error(f"Error saving data sources: {e}")
+            continue
+        st.session_state.data_sources[filename] = store.get_file(filename)
+    return replaced_chunk_ids
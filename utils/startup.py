@@ -0,0 +1,128 @@
+from typing import List, Dict, Any, Optional
+import importlib
+import subprocess
+import threading
+import logging
+import sys
+import time
+
+HEAVY_MODULES = (
+    "pandas",
+    "langchain",
+    "langchain_openai",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "torch",
+    "pinecone",
+)
+
+WARM_UP_MODULES = (
+    "logic.data_processing",
+    "logic.chunking",
+    "logic.qa_chain",
+)
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread: Optional[threading.Thread] = None
+_warm_up_state: Dict[str, Any] = {"started": None, "finished": None, "error": None}
+_snapshot_lock = threading.Lock()
+_snapshot_state: Dict[str, Any] = {"attempted": False, "snapshot": None, "error": None}
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def restore_snapshot_on_boot() -> Optional[Dict[str, Any]]:
+    with _snapshot_lock:
+        if _snapshot_state["attempted"]:
+            return _snapshot_state["snapshot"]
+        _snapshot_state["attempted"] = True
+        from logic.snapshot import latest_snapshot, read_snapshot, restore_state, SNAPSHOT_RESTORE_ON_BOOT
+
+        if not SNAPSHOT_RESTORE_ON_BOOT:
+            return None
+        try:
+            started = time.perf_counter()
+            path = latest_snapshot()
+            if path is None:
+                return None
+            snapshot = read_snapshot(path)
+            snapshot["restored"] = restore_state(snapshot)
+            snapshot["restore_seconds"] = round(time.perf_counter() - started, 3)
+            _snapshot_state["snapshot"] = snapshot
+            logging.info(f"Restored {', '.join(snapshot['restored']) or 'nothing'} from snapshot {path.name}")
+        except Exception as e:
+            _snapshot_state["error"] = str(e)
+            logging.warning(f"Snapshot restore failed: {e}")
+        return _snapshot_state["snapshot"]
+
+def _warm_up():
+    try:
+        snapshot = restore_snapshot_on_boot()
+        if snapshot:
+            from logic.snapshot import restore_warm_caches
+            snapshot["restored"] = snapshot["restored"] + restore_warm_caches(snapshot)
+        for module in WARM_UP_MODULES:
+            importlib.import_module(module)
+        from logic.embedding import get_query_embedding_model
+        get_query_embedding_model().embed_query("warm up")
+    except Exception as e:
+        _warm_up_state["error"] = str(e)
+        logging.warning(f"Background warm-up failed: {e}")
+    finally:
+        _warm_up_state["finished"] = time.time()
+
+def warm_up_in_background() -> threading.Thread:
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_state["started"] = time.time()
+            _warm_up_thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+def get_warm_up_state() -> Dict[str, Any]:
+    return dict(_warm_up_state)
+
+def get_readiness() -> Dict[str, Any]:
+    state = get_warm_up_state()
+    snapshot = _snapshot_state["snapshot"]
+    if state["started"] is None:
+        stage = "cold"
+    elif state["finished"] is None:
+        stage = "warming"
+    else:
+        stage = "degraded" if state["error"] else "ready"
+    return {
+        "ready": stage == "ready",
+        "stage": stage,
+        "warm_up_seconds": round((state["finished"] or time.time()) - state["started"], 2) if state["started"] else None,
+        "snapshot": snapshot["name"] if snapshot else None,
+        "restored": list(snapshot["restored"]) if snapshot else [],
+        "error": state["error"] or _snapshot_state["error"]
+    }
+
+def profile_imports(module: str, top: int = 15) -> List[Dict[str, Any]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return entries[:top]
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or ["app", "utils.auth", "logic.qa_chain", "core.vector_store"]
+    for target in targets:
+        print(f"== import {target}")
+        for entry in profile_imports(target):
+            print(f"{entry['cumulative_ms']:10.1f} ms  {entry['self_ms']:8.1f} ms  {entry['module']}")